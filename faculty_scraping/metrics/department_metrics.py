@@ -1,9 +1,10 @@
-def compute_department_metrics(scraper, records, total_urls, run_id):
-    records_parsed = len(records)
+def compute_department_metrics(scraper, total_urls, run_id):
+    #the records themselves are already written in batches, the scraper counts them as they are parsed
+    records_parsed = scraper.records_parsed
     parse_failures = scraper.parse_failures
     pages_fetched = scraper.pages_fetched
     browser_fallbacks = scraper.browser_fetched
-    emails_found = sum(1 for r in records if r.get("email"))
+    emails_found = scraper.email_count
 
 
     return {
@@ -1,9 +1,11 @@
-from storage.duckdb_writer import DuckDBWriter
+from storage.async_writer import AsyncDuckDBWriter
 from metrics.run_metrics import compute_run_stats
 from metrics.department_metrics import compute_department_metrics
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import logging
+import os
+import time
 import uuid
 import argparse
 
@@ -13,8 +15,20 @@ from scrapers.data_science_scraper import DataScienceScraper
 from scrapers.computer_science_scraper import ComputerScienceScraper
 from scrapers.psychology_scraper import PsychologyScraper
 from scrapers.economics_scraper import EconomicsScraper
+from scrapers.rate_limiter import HostLimiter
+from scrapers.resilience import CircuitBreaker, RetryPolicy
+from scrapers.browser_service import BrowserService
+from scrapers.html_backends import PARSER_BACKENDS
+from scrapers.parsing import make_parse_executor
+from scrapers.routing import FetchRouter
+from scrapers.scheduler import RunScheduler
 import asyncio
 
+DB_PATH = "faculty.duckdb"
+
+#stored pages read from DuckDB and parsed at a time by --reextract
+REEXTRACT_BATCH_SIZE = 500
+
 DEPARTMENT_SCRAPERS = {
     "data science": DataScienceScraper,
     "computer science": ComputerScienceScraper,
@@ -31,11 +45,84 @@ def parse_args():
         "--departments",
         nargs="+",
         choices=DEPARTMENT_SCRAPERS.keys(),
-        required=True,
-        help="Departments to scrape"
+        help="Departments to scrape (with --reextract the departments to re-extract, defaults to all)"
+    )
+
+    parser.add_argument(
+        "--reextract",
+        action="store_true",
+        help="Re-run the department parsers over the stored raw pages and update faculty_records, no network at all"
+    )
+
+    parser.add_argument(
+        "--run-id",
+        default=None,
+        help="With --reextract, re-extract the pages of this run instead of the latest page of every url"
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Ignore stored ETag/Last-Modified validators, content fingerprints and cached directory crawls, download and parse every page in full"
+    )
+
+    parser.add_argument(
+        "--discovery-ttl",
+        type=int,
+        default=60,
+        help="Minutes a department's directory crawl is reused by later runs, 0 always rediscovers"
+    )
+
+    parser.add_argument(
+        "--http-budget",
+        type=int,
+        default=48,
+        help="HTTP requests in flight at once across all departments"
+    )
+
+    parser.add_argument(
+        "--browser-budget",
+        type=int,
+        default=4,
+        help="Browser pages open at once across all departments"
+    )
+
+    parser.add_argument(
+        "--headed",
+        action="store_true",
+        help="Launch the browser headed from the start instead of only after a headless challenge fails"
+    )
+
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=None,
+        help="Workers parsing profile pages in parallel, defaults to the number of cores, 0 parses on the event loop"
+    )
+
+    parser.add_argument(
+        "--parser-backend",
+        choices=PARSER_BACKENDS,
+        default=None,
+        help="HTML parser for every department that doesn't pin its own, defaults to html.parser, selectolax is by far the fastest"
+    )
+
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=3,
+        help="Retries for timeouts, connection errors and 429/5xx responses before a page is given up"
+    )
+
+    args = parser.parse_args()
+
+    if not args.departments and not args.reextract:
+        parser.error("--departments is required unless --reextract is given")
+
+    if args.run_id and not args.reextract:
+        parser.error("--run-id only applies to --reextract")
+
+    return args
 
 logging.basicConfig(
     level=logging.INFO,
@@ -59,6 +146,10 @@ async def main():
 
     #for command line arguments
     args=parse_args()
+
+    if args.reextract:
+        await reextract(args)
+        return
     
     eastern_timezone = ZoneInfo("America/New_York")
 
@@ -70,57 +161,238 @@ async def main():
     logger.info(f"Starting scrape run {run_id}")
 
     
-    db = DuckDBWriter("faculty.duckdb")
-    db.init_tables()
+    db_path = DB_PATH
+
+    #the connection lives on a writer thread, so storing a batch never holds up the fetches in flight
+    db = AsyncDuckDBWriter(db_path)
+    await db.start()
+
+    #whatever was submitted is committed even if the run fails or is interrupted, so the micro batches
+    #stored so far are kept
+    failed = True
+    try:
+        await db.call("init_tables")
     
-    # SCRAPERS = [
-    #         DataScienceScraper(run_id=run_id), 
-    #         ComputerScienceScraper(run_id=run_id),
-    #         PsychologyScraper(run_id=run_id),
-    #         EconomicsScraper(run_id=run_id)
-    # ]
-
-    SCRAPERS = [DEPARTMENT_SCRAPERS[dept](run_id=run_id) for dept in args.departments]
+        # SCRAPERS = [
+        #         DataScienceScraper(run_id=run_id), 
+        #         ComputerScienceScraper(run_id=run_id),
+        #         PsychologyScraper(run_id=run_id),
+        #         EconomicsScraper(run_id=run_id)
+        # ]
+
+        #validators from earlier runs so unchanged profile pages come back as cheap 304s
+        validators = {} if args.full_refresh else await db.call("load_validators")
+
+        #content fingerprints for the pages served without validators, unchanged ones are skipped after the download
+        fingerprints = {} if args.full_refresh else await db.call("load_fingerprints")
+
+        #one set of per host limiters for the whole run, so a host shared by departments is throttled as one
+        http_limiter = HostLimiter(initial=4, max_limit=32)
+        browser_limiter = HostLimiter(initial=1, max_limit=3)
+
+        #shared as well so a host that is down is noticed once, not once per department
+        retry_policy = RetryPolicy(max_retries=args.max_retries)
+        circuit_breaker = CircuitBreaker()
+
+        #which hosts need the browser, remembered from earlier runs
+        router = FetchRouter(await db.call("load_host_routes"))
+
+        #browser cookies and local storage live next to the database so Cloudflare trust carries over between runs
+        browser_state_path = os.path.join(os.path.dirname(db_path), "browser_state.json")
+
+        #one chromium for the whole run, each department gets its own context in it
+        browser = BrowserService(headless=not args.headed, storage_state_path=browser_state_path)
+
+        #profile pages are parsed on other cores while the event loop keeps fetching
+        parse_executor = make_parse_executor(args.parse_workers)
+
+        #drives every department at once, sharing one global HTTP and browser budget fairly between them
+        scheduler = RunScheduler(http_budget=args.http_budget, browser_budget=args.browser_budget)
+
+        #directory crawls recent enough to reuse, discovery_ttl=0 turns the cache off
+        discovery_ttl = 0 if args.full_refresh else args.discovery_ttl
+
+        SCRAPERS = [
+            DEPARTMENT_SCRAPERS[dept](
+                run_id=run_id,
+                validators=validators,
+                fingerprints=fingerprints,
+                http_limiter=http_limiter,
+                browser_limiter=browser_limiter,
+                retry_policy=retry_policy,
+                circuit_breaker=circuit_breaker,
+                router=router,
+                browser=browser,
+                parse_executor=parse_executor,
+                parser_backend=args.parser_backend,
+                http_budget=scheduler.http_budget,
+                browser_budget=scheduler.browser_budget,
+            )
+            for dept in args.departments
+        ]
+
+        for scraper in SCRAPERS:
+            scraper.cached_links = await db.call("load_discovery", scraper.department, discovery_ttl)
   
 
-    for scraper in SCRAPERS:
-        urls = await scraper.get_faculty_links()
-        raw_pages, records = await scraper.scrape()
+        async def write_batch(scraper, raw_pages, records):
+            """
+            stores a micro batch of one department's pages and records while the department is still scraping
+            """
+            #queued for the writer thread, which merges the batches waiting on it into one transaction
+            await db.submit("insert_raw_pages", raw_pages)
+
+            #a batch of pages whose content is unchanged has no records to write
+            if records:
+                await db.submit("insert_records", records)
+
+
+        async def write_department(scraper):
+            """
+            stores one department's metrics and caches as soon as that department finishes
+            """
+            #discovery happens once inside scrape(), the urls it found are left on the scraper
+            if scraper.cached_links is None:
+                await db.submit("save_discovery", scraper.department, scraper.faculty_urls)
+
+            await db.submit("upsert_validators", scraper.fresh_validators)
+            await db.submit("upsert_fingerprints", scraper.fresh_fingerprints)
+            await db.submit("upsert_host_routes", router.pop_changes())
+
+            dept_metrics = compute_department_metrics(
+                scraper=scraper,
+                total_urls=len(scraper.faculty_urls),
+                run_id=run_id,
+            )
+
+            await db.submit("insert_department_metrics", dept_metrics)
+
+            logger.info(
+                f"[{scraper.department}] "
+                f"fail={dept_metrics['failed_pct']:.1%}, "
+                f"email={dept_metrics['email_pct']:.1%}, "
+                f"unchanged={scraper.pages_unchanged}"
+            )
+
+
+        #all departments run concurrently, so the run takes about as long as the slowest one
+        try:
+            await scheduler.run(SCRAPERS, write_batch, write_department)
+        finally:
+            await browser.close()
+            if parse_executor:
+                parse_executor.shutdown()
+
+        finished_at = datetime.now(eastern_timezone)
+
+
+        run_stats = compute_run_stats(
+                run_id=run_id,
+                started_at=started_at,
+                finished_at=finished_at,
+                scrapers=SCRAPERS,
+            )
+        await db.submit("insert_scrape_run", run_stats)
+
+        failed = False
+
+    finally:
+        #waits for everything still queued to be committed, a write error fails the run unless it already
+        #failed, then it is only logged so it doesn't hide the error the run failed with
+        try:
+            await db.close()
+        except Exception as e:
+            logger.error(f"Writing to DuckDB failed: {e}")
+            if not failed:
+                raise
 
-    
-        db.insert_raw_pages(raw_pages)
-        db.insert_records(records)
-
-        dept_metrics = compute_department_metrics(
-            scraper=scraper,
-            records=records,
-            total_urls=len(urls),
-            run_id=run_id,
-        )
-
-        db.insert_department_metrics(dept_metrics)
-
-        logger.info(
-            f"[{scraper.department}] "
-            f"fail={dept_metrics['failed_pct']:.1%}, "
-            f"email={dept_metrics['email_pct']:.1%}"
-        )
-
-    finished_at = datetime.now(eastern_timezone)
-
-
-    run_stats = compute_run_stats(
-            run_id=run_id,
-            started_at=started_at,
-            finished_at=finished_at,
-            scrapers=SCRAPERS,
-        )
-    db.insert_scrape_run(run_stats)
     logger.info(f"Finished scrape run {run_id}")
     logger.info(f"Data Written to DuckDB")
         
 
 
 
+async def reextract(args):
+    """
+    Re-runs the department parsers over the raw pages stored in DuckDB and upserts the records, for when a
+    parser improved and the stored pages should be read again without scraping anything live
+
+    The pages stream out of DuckDB in batches on a reader thread (the next batch is read while the current one
+    is parsed), are parsed in the parse pool and each batch's records are bulk upserted by the writer thread
+    """
+    started = time.perf_counter()
+    logger.info(f"Re-extracting {'run ' + args.run_id if args.run_id else 'the latest page of every url'}")
+
+    db = AsyncDuckDBWriter(DB_PATH)
+    await db.start()
+    await db.call("init_tables")
+
+    parse_executor = make_parse_executor(args.parse_workers)
+
+    #one scraper per department, only used for parsing, nothing is ever fetched through them
+    scrapers = {}
+
+    def scraper_for(department: str):
+        key = department.lower()
+        if key not in scrapers:
+            scrapers[key] = DEPARTMENT_SCRAPERS[key](
+                run_id=args.run_id or "reextract",
+                parse_executor=parse_executor,
+                parser_backend=args.parser_backend,
+            )
+        return scrapers[key]
+
+    async def reextract_page(page):
+        record = await scraper_for(page["department"])._parse_profile(page)
+
+        #the record describes the page as it was when it was scraped
+        if record:
+            record["scraped_at"] = page["scraped_at"]
+        return record
+
+    pages_read = 0
+    skipped = set()
+    next_batch = None
+
+    try:
+        batches = await db.call("raw_page_batches", args.run_id, args.departments, REEXTRACT_BATCH_SIZE)
+        next_batch = asyncio.create_task(asyncio.to_thread(next, batches, None))
+
+        while (pages := await next_batch) is not None:
+            next_batch = asyncio.create_task(asyncio.to_thread(next, batches, None))
+            pages_read += len(pages)
+
+            #pages of departments that no longer have a scraper can't be parsed
+            for page in pages:
+                if page["department"].lower() not in DEPARTMENT_SCRAPERS:
+                    skipped.add(page["department"])
+            pages = [page for page in pages if page["department"].lower() in DEPARTMENT_SCRAPERS]
+
+            records = await asyncio.gather(*(reextract_page(page) for page in pages))
+            await db.submit("insert_records", [record for record in records if record])
+
+    finally:
+        #a batch still being read holds the reader cursor
+        if next_batch:
+            await asyncio.gather(next_batch, return_exceptions=True)
+
+        for scraper in scrapers.values():
+            await scraper.close()
+        if parse_executor:
+            parse_executor.shutdown()
+
+        await db.close()
+
+    if skipped:
+        logger.warning(f"Skipped the pages of departments without a scraper: {sorted(skipped)}")
+
+    logger.info(
+        f"Re-extracted {pages_read} pages in {time.perf_counter() - started:.1f}s | "
+        + " ".join(f"{s.department}: records={s.records_parsed} failures={s.parse_failures}" for s in scrapers.values())
+    )
+
+
+
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,15 +1,47 @@
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
 from datetime import datetime, timezone
-import requests
+import httpx
 from urllib.parse import urljoin
-from playwright.async_api import async_playwright
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 import asyncio
+import os
+import time
 from zoneinfo import ZoneInfo
 import logging
 
+from .browser_service import BrowserService
+from .extract import FieldExtractor
+from .encoding import PageBytes, resolve_encoding
+from .fingerprint import content_fingerprint
+from .html_backends import extract_links, parse_html, resolve_backend
+from .parsing import parse_in_worker
+from .rate_limiter import HostLimiter, host_of
+from .routing import FetchRouter, RoutedToBrowser
+from .resilience import (
+    TRANSIENT_STATUSES,
+    BotChallengeError,
+    CircuitBreaker,
+    ForbiddenError,
+    RetryPolicy,
+    TransientHTTPError,
+)
+
 logger = logging.getLogger(__name__)
 
 
+#HTTP/2 needs the optional h2 package, without it httpx only speaks HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+#put on a scrape() pipeline queue once per worker of the next stage when the stage before it is done
+_DONE = object()
+
+
 class FacultyScraper(ABC):
 
     """
@@ -19,7 +51,7 @@ class FacultyScraper(ABC):
 
     Subclasses are responsible only for:
         - discovering faculty profile URLs
-        - parsing department-specific profile page HTML
+        - describing (FIELDS) or parsing department-specific profile page HTML
 
     This class:
         - Manages HTTP state
@@ -30,38 +62,158 @@ class FacultyScraper(ABC):
     #department name, which must be overridden by subclasses
     department: str
 
+    #root of the department site, which must be defined by subclasses
+    BASE_URL: str
+
+    #elements that show a browser rendered page has its real content (and isn't still on a challenge),
+    #subclasses set these for their profile and directory pages, None means the page is read right away
+    PROFILE_READY_SELECTOR: str | None = None
+    DIRECTORY_READY_SELECTOR: str | None = None
+
+    #declarative rules for the profile page fields (see extract.py), compiled into one pass over the page
+    FIELDS: dict | None = None
+
+    #parts of a profile page (simple selectors like "div.field-body") the tree is built for, None takes the
+    #regions the FIELDS rules read, () always builds the whole page
+    PROFILE_REGIONS: tuple[str, ...] | None = None
+
+    #html parser backend of the department ("html.parser", "lxml" or "selectolax"), None follows the run's
+    #parser_backend option, a department whose pages one backend handles badly can pin another here
+    PARSER_BACKEND: str | None = None
+
+    #share of the run's global HTTP/browser budget relative to the other departments
+    SCHEDULE_WEIGHT = 1.0
+
+    #workers of each stage of the scrape() pipeline, None fetches with as many workers as the http limiter
+    #ever lets a host have in flight and parses with one worker per core of the parse pool
+    FETCH_WORKERS: int | None = None
+    PARSE_WORKERS: int | None = None
+
+    #records (and their raw pages) handed to the sink at a time
+    WRITE_BATCH_SIZE = 25
+
+    #playwright timeouts
+    NAVIGATION_TIMEOUT_MS = 60000
+    READY_TIMEOUT_MS = 10000
+
+    #only present on the Cloudflare interstitial ("Just a moment...") page, not on pages that passed it
+    CHALLENGE_MARKERS = ("<title>Just a moment", "cf_chl_opt", "cf-browser-verification", "challenge-running")
+
+    #the interstitial puts its markers in the <head>, so only this much of an HTTP response is scanned for them
+    BLOCK_SCAN_BYTES = 32 * 1024
+
+    #cookie Cloudflare sets once a browser passes its challenge, and how long to trust it if it has no expiry
+    CLEARANCE_COOKIE = "cf_clearance"
+    DEFAULT_CLEARANCE_TTL = 30 * 60
+
+
+
+    #mimics real user to prevent scraping blocking risk
+    USER_AGENT = (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    )
+
+
+
+    def __init__(
+        self,
+        run_id: str,
+        *args,
+        http2: bool = True,
+        validators: dict | None = None,
+        fingerprints: dict | None = None,
+        http_limiter: HostLimiter | None = None,
+        browser_limiter: HostLimiter | None = None,
+        retry_policy: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        router: FetchRouter | None = None,
+        headless: bool = True,
+        browser_state_path: str | None = None,
+        cached_links: list[str] | None = None,
+        browser: BrowserService | None = None,
+        http_budget=None,
+        browser_budget=None,
+        parse_executor=None,
+        parser_backend: str | None = None,
+        **kwargs,
+    ):
+        self.run_id = run_id
 
+        #profile urls from a recent directory crawl (the DuckDB discovery cache), used instead of discovering again
+        self.cached_links = cached_links
 
-    def __init__(self, run_id: str, *args, **kwargs):
-        #only uses a single consistent HTTP session instead of a new one for every page
-        #mimics real user to prevent scraping blocking risk
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": (
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            )
-        })
-        self.run_id = run_id
+        #every profile url scrape() discovered (or took from the cache) this run
+        self.faculty_urls = []
+
+        #ETag / Last-Modified validators from earlier runs keyed by url, loaded from DuckDB by run.py
+        #profile pages that still match are answered with a 304 and skipped entirely
+        self.validators = validators if validators is not None else {}
 
+        #validators seen this run, only promoted to fresh_validators once the page parsed successfully
+        #so that a failed parse is never cached as "unchanged" on the next run
+        self._pending_validators = {}
+        self.fresh_validators = {}
 
-        self._playwright = None
-        self._browser = None
+        #content fingerprints (fingerprint.py) of the profile pages as of their last successful parse, keyed by url,
+        #a page downloaded in full whose fingerprint still matches is skipped like a 304. Promoted the same way
+        #as the validators, so only fingerprints of pages that parsed are stored. Checked in the parse stage
+        self.fingerprints = fingerprints if fingerprints is not None else {}
+        self._pending_fingerprints = {}
+        self.fresh_fingerprints = {}
+
+        #the async HTTP client is created lazily in _get_client() so it is bound to the running event loop
+        self._client = None
+        self.http2 = http2 and HTTP2_AVAILABLE
+
+        #host -> the router's clearance whose cookies are in this scraper's HTTP client
+        self._applied_clearances = {}
+
+        #run.py shares one chromium between all departments, a scraper used on its own gets a private one
+        #(headless and browser_state_path only apply to that private browser) and shuts it down itself
+        self._owns_browser = browser is None
+        self.browser = browser or BrowserService(headless=headless, storage_state_path=browser_state_path)
+
+        #task that starts the browser early for hosts known to need it
+        self._browser_warmup = None
 
         # metrics
         self.parse_failures = 0
+        self.records_parsed = 0
+        self.email_count = 0
         self.pages_fetched = 0
         self.http_fetches = 0
         self.browser_fetched = 0
+        self.pages_unchanged = 0
+        self.http_retries = 0
+
+        #concurrency, adaptive per host limits that grow while a host responds well and back off when it pushes back
+        #run.py passes the same limiters to every scraper so a host shared between departments has one limit
+        self.http_limiter = http_limiter or HostLimiter(initial=4, max_limit=32) #allows for many http fetches
+        self.browser_limiter = browser_limiter or HostLimiter(initial=1, max_limit=3) #restricts playwright tabs
+
+        #global budgets shared by all departments of a run (FairBudget from scheduler.py), None means no global cap
+        self.http_budget = http_budget
+        self.browser_budget = browser_budget
+
+        #pool parse_faculty_page runs in (make_parse_executor in parsing.py), None parses inline on the event loop
+        self.parse_executor = parse_executor
+
+        #tree builder behind parse_html(), see html_backends.py
+        self.parser_backend = resolve_backend(self.PARSER_BACKEND or parser_backend)
 
-        #concurrency
-        self.http_sem = asyncio.Semaphore(10) #allows for many http fetches
-        self.browser_sem = asyncio.Semaphore(3) #restricts playwright tabs
+        #transient HTTP failures are retried with backoff, hosts that are clearly down are failed fast
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+        #per host memory of which hosts need the browser, persisted across runs by run.py
+        self.router = router or FetchRouter()
 
         logger.info(f"Initialized {self.__class__.__name__} | "
-                    f"http_concurrency={self.http_sem._value} | "
-                    f"browser_concurrency={self.browser_sem._value}"            
+                    f"http_concurrency<={self.http_limiter.max_limit} | "
+                    f"browser_concurrency<={self.browser_limiter.max_limit} | "
+                    f"http2={self.http2}"
         )
 
 
@@ -75,6 +227,23 @@ class FacultyScraper(ABC):
 
 
 
+    def __init_subclass__(cls, **kwargs):
+        """
+        Checks at class creation that a department can parse its profile pages, either with FIELDS rules
+        or with its own parse_faculty_page, instead of failing on the first page of a run
+
+        Subclasses that still leave get_faculty_links abstract are intermediate bases and aren't checked
+        """
+        super().__init_subclass__(**kwargs)
+
+        if getattr(cls.get_faculty_links, "__isabstractmethod__", False):
+            return
+
+        if not cls.FIELDS and cls.parse_faculty_page is FacultyScraper.parse_faculty_page:
+            raise TypeError(f"{cls.__name__} needs FIELDS or its own parse_faculty_page")
+
+
+
     @abstractmethod
     async def get_faculty_links(self) -> list[str]:
         """
@@ -84,15 +253,62 @@ class FacultyScraper(ABC):
         """
         pass
 
-    @abstractmethod 
-    def parse_faculty_page(self, html:str, url:str) -> dict:
+    async def iter_faculty_links(self):
+        """
+        Yields the faculty profile URLs of a department as they are discovered
+
+        scrape() starts fetching each profile as soon as it is yielded. The default just yields the 
+        result of get_faculty_links(), departments with several directory pages override this to 
+        stream links while the remaining directory pages are still loading
+        """
+        for url in await self.get_faculty_links():
+            yield url
+
+
+
+    async def _discover(self):
+        """
+        Yields the profile urls from the discovery cache if run.py handed over a fresh one, otherwise from the live directory
+        """
+        if self.cached_links is not None:
+            logger.info(f"[{self.department}] using {len(self.cached_links)} cached profile urls")
+            for url in self.cached_links:
+                yield url
+            return
+
+        async for url in self.iter_faculty_links():
+            yield url
+
+
+
+    def parse_faculty_page(self, html: str | bytes, url:str) -> dict:
         """
         Extracts normalized faculty data from a single profile page
 
+        Departments that declare FIELDS get this for free, their rules are compiled once into a single 
+        pass extractor. Departments whose pages the rules can't describe override it instead
+
         Subclasses should only return the fields they can confidently extract
         The missing fields will be filled in by the normalization step
         """
-        pass
+        return self._field_extractor().extract(self.parse_html(html, regions=self._profile_regions()))
+
+
+
+    @classmethod
+    def _profile_regions(cls) -> tuple[str, ...] | None:
+        if cls.PROFILE_REGIONS is not None:
+            return cls.PROFILE_REGIONS or None
+        return cls._field_extractor().regions if cls.FIELDS else None
+
+
+
+    @classmethod
+    def _field_extractor(cls) -> FieldExtractor:
+        #compiled on first use per class (and per parse worker process)
+        if "_compiled_fields" not in cls.__dict__:
+            cls._compiled_fields = FieldExtractor(cls.FIELDS)
+        return cls._compiled_fields
 
 
 
@@ -106,32 +322,35 @@ class FacultyScraper(ABC):
 
 
 
-    async def fetch_page(self,url:str) -> tuple[str,str]:
+    async def fetch_page(self,url:str, profile: bool = False) -> tuple[str | bytes | None,str]:
         """
         Fetches a page and returns raw HTML and the fetching method. 
-        Tries requests first, falls back to Playwright if Cloudflare blocks.
+        Tries an async HTTP request first, falls back to Playwright if Cloudflare blocks.
+
+        Transient failures (timeouts, reset connections, 429/5xx) are retried over HTTP with jittered 
+        exponential backoff, the browser is only used for real bot protection blocks.
 
+        Profile pages are revalidated with a conditional GET, if the server answers 304 the page is 
+        unchanged since the last run and (None, "not_modified") is returned. Directory pages are always 
+        fetched in full since the links have to be read every run.
         """
+        #hosts known to challenge HTTP clients go straight to the browser, apart from an occasional probe
+        method = self.router.method_for(url)
+        if method == "browser":
+            return await self._fetch_browser(url, profile)
+
         try:
-            async with self.http_sem:
-                #http request
-                r = self.session.get(url, timeout = 10)
-                #raises error if http response fails
-                r.raise_for_status()
-
-                #checks to see if cloudflare blocks scraping through bot test
-                if self._is_cloudflare_block(r.text):
-                    raise RuntimeError("Cloudflare challenge detected")
-
-                #if scrape successful
-                self.http_fetches += 1
-                self.pages_fetched += 1
-
-                #returns the raw html and our fetch method, http since successful
-                return r.text, "http"
-        
+            result = await self._fetch_http(url, profile, sticky=method == "http")
+
+        except RoutedToBrowser:
+            return await self._fetch_browser(url, profile)
+
+        except BotChallengeError as e:
+            #remembers the block so the rest of the host's pages skip the doomed HTTP attempt, a bare 403
+            #might be a single forbidden page so that one only falls back for this page
+            if not isinstance(e, ForbiddenError):
+                self.router.record_block(url)
 
-        except (requests.HTTPError, requests.Timeout, RuntimeError) as e:
             print(f"[fetch_page] falling back to browser scrape through playwright for {url} because of -> ({e})")
             logger.warning(
                 "Falling back to Playwright",
@@ -141,107 +360,352 @@ class FacultyScraper(ABC):
                     "reason": str(e),
                 },
             )
+            return await self._fetch_browser(url, profile)
 
-            async with self.browser_sem:
+        finally:
+            if method == "probe":
+                self.router.end_probe(url)
+
+        self.router.record_http_ok(url)
+        return result
+
+
+
+    async def _fetch_browser(self, url: str, profile: bool) -> tuple[str, str]:
+        """
+        Fetches a page through Playwright
+        """
+        ready_selector = self.PROFILE_READY_SELECTOR if profile else self.DIRECTORY_READY_SELECTOR
+
+        async with self.browser_limiter.slot(url) as slot:
+            #another page earned a clearance while this one waited for a tab, plain HTTP works now
+            cleared = self.router.has_clearance(url)
+
+            if cleared:
+                slot.skip()
+            else:
                 #using real browser to load page and get the html
-                html = await self._playwright_page_scraper(url)
+                async with self._budget_slot(self.browser_budget):
+                    html = await self._playwright_page_scraper(url, ready_selector)
+
+        if cleared:
+            return await self.fetch_page(url, profile)
+
+        self.pages_fetched += 1
+        self.browser_fetched += 1
+        return html, "browser"
+
+
+
+    async def _fetch_http(self, url: str, profile: bool, sticky: bool = False) -> tuple[str | bytes | None, str]:
+        """
+        Fetches a page over HTTP, retrying transient failures according to the retry policy
+
+        With sticky set the request is abandoned with RoutedToBrowser if its host got routed to the 
+        browser while it was waiting for a slot
 
+        Raises BotChallengeError when the host serves a bot protection page, HostUnavailableError when 
+        the host's circuit breaker gave up on it, and the last error once the retries are used up
+
+        While the host's breaker is open the page waits for the host to come back instead of failing,
+        it is fetched once the probe gets through
+        """
+        attempt = 0
+
+        #a page counts against its host once however often it is retried
+        counted = False
+
+        while True:
+            #waits without touching the network while the host is considered down
+            probe = await self.circuit_breaker.before_request(url)
+
+            try:
+                result = await self._http_attempt(url, profile, sticky)
+
+            except (httpx.TransportError, TransientHTTPError) as e:
+                #timeouts, refused/reset connections and 5xx count against the host, a 429 is the host pacing
+                #us and the limiter already waits out its Retry-After
+                if probe or not (counted or getattr(e, "status_code", None) == 429):
+                    self.circuit_breaker.record_failure(url, probe=probe)
+                    counted = True
+
+                #the host is paused, the page waits for it in before_request without using up its retries
+                if self.circuit_breaker.is_open(url):
+                    continue
+
+                if attempt >= self.retry_policy.max_retries:
+                    raise
+
+                delay = self.retry_policy.delay(attempt)
+                attempt += 1
+                self.http_retries += 1
+
+                logger.info(
+                    f"[{self.department}] retrying {url} in {delay:.2f}s "
+                    f"(attempt {attempt}/{self.retry_policy.max_retries}) because of -> ({e!r})"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            except (BotChallengeError, httpx.HTTPStatusError):
+                #the host answered, so it is up even though we can't use the answer
+                self.circuit_breaker.record_success(url)
+                raise
+
+            finally:
+                #a probe that says nothing about the host (RoutedToBrowser, cancelled, too many redirects...)
+                #mustn't keep the probe slot, or the breaker would stay open for the rest of the run
+                if probe:
+                    self.circuit_breaker.end_probe(url)
+
+            self.circuit_breaker.record_success(url)
+            return result
+
+
+
+    async def _http_attempt(self, url: str, profile: bool, sticky: bool) -> tuple[str | bytes | None, str]:
+        """
+        A single HTTP request for a page
+        """
+        client = self._get_client()
+
+        #reads the Crawl-delay of the host the first time it is contacted
+        await self.http_limiter.ensure_robots(url, self._fetch_robots)
+
+        #sends the stored validators so the server can answer with a bodyless 304
+        headers = self._conditional_headers(url) if profile else {}
+
+        #a host cleared through the browser (by any department) expects its cookies and its user agent
+        clearance = self.router.clearance(url)
+        if clearance:
+            self._apply_clearance(client, url, clearance)
+            headers["User-Agent"] = clearance["user_agent"]
+
+        async with self.http_limiter.slot(url) as slot:
+            #another request to the host hit a challenge while this one was queued
+            if sticky and self.router.prefers_browser(url):
+                slot.skip()
+                raise RoutedToBrowser(url)
+
+            async with self._budget_slot(self.http_budget):
+                #the latency the limiter measures starts once the global budget lets the request through
+                slot.reset_clock()
+
+                #http request, awaiting here hands the event loop to the other fetches instead of blocking it
+                r = await client.get(url, headers=headers)
+
+            #429/503 shrink the host's limit and pause it for the Retry-After
+            slot.record_response(r.status_code, r.headers)
+
+            #page hasn't changed since the validators were stored
+            if r.status_code == 304:
+                self.pages_unchanged += 1
+                return None, "not_modified"
+
+            #checks to see if cloudflare blocks scraping through bot test, challenges come back as 403/503
+            #so this is checked before the status code
+            if self._is_cloudflare_block(r):
+                slot.backoff()
+                raise BotChallengeError("Cloudflare challenge detected")
+
+            if r.status_code == 403:
+                raise ForbiddenError(f"HTTP 403 for {url}")
+
+            if r.status_code in TRANSIENT_STATUSES:
+                raise TransientHTTPError(r.status_code, url)
+
+            #raises error if http response fails, any other 4xx is permanent
+            r.raise_for_status()
+
+            #if scrape successful
+            self.http_fetches += 1
             self.pages_fetched += 1
-            self.browser_fetched += 1
-            return html, "browser"
 
+            if profile:
+                self._remember_validators(url, r.headers)
+
+            #returns the raw bytes (decoded once, by the parser) and our fetch method, http since successful
+            #the encoding comes from the charset header or a <meta> tag, the body is never run through detection
+            return PageBytes(r.content, resolve_encoding(r.content, r.headers.get("content-type"))), "http"
 
 
 
 
-    async def _scrape_one(self, url: str):
+
+    async def _fetch_profile(self, url: str) -> dict | None:
         """
-        Scrapes a single faculty profile page
+        Fetches a single faculty profile page
 
-        Returns snapshot of html page with some metadata, and returns and normalized faculty data
+        Returns snapshot of html page with some metadata, None if the page is unchanged or couldn't be fetched
         """
         try:
-            html, fetch_method = await self.fetch_page(url)
-
-            raw_page = {
-                "run_id" : self.run_id,
-                "department": self.department,
-                "url": url,
-                "html": html,
-                "fetch_method": fetch_method,
-                "scraped_at": datetime.now(ZoneInfo("America/New_York")),
-            }
+            html, fetch_method = await self.fetch_page(url, profile=True)
 
+        except Exception as e:
+            self._record_failure(url, e)
+            return None
+
+        #unchanged since the last run, nothing to parse or store
+        if fetch_method == "not_modified":
+            return None
+
+        return {
+            "run_id" : self.run_id,
+            "department": self.department,
+            "url": url,
+            "html": html,
+            "fetch_method": fetch_method,
+            "scraped_at": datetime.now(ZoneInfo("America/New_York")),
+        }
+
+
+
+
+    async def _content_unchanged(self, raw_page: dict) -> bool:
+        """
+        True when a page downloaded in full only differs from its last parse in volatile bits (tokens,
+        timestamps, asset versions) or outside its profile regions, the stored record is still right so the
+        page isn't parsed again
+
+        Hashed on a thread, it is a few ms of regex per page that would otherwise hold up every fetch in flight
+        """
+        url = raw_page["url"]
+        fingerprint = await asyncio.to_thread(content_fingerprint, raw_page["html"], self._profile_regions())
+
+        if self.fingerprints.get(url) == fingerprint:
+            self.pages_unchanged += 1
+            self._confirm(url)
+            return True
+
+        self._pending_fingerprints[url] = fingerprint
+        return False
+
+
+
+
+    async def _parse_profile(self, raw_page: dict) -> dict | None:
+        """
+        Parses a fetched profile page into a normalized faculty record, None if parsing failed
+        """
+        url = raw_page["url"]
+
+        try:
             #parse_faculty page is defined uniquely for each department, gets metadata from single faculty page
-            record = self.parse_faculty_page(html, url)
+            record = await self._parse(raw_page["html"], url)
             record["department"] = self.department
             record["webpage_link"] = url
 
-            return raw_page, self._normalize(record)
-
         except Exception as e:
-            self.parse_failures += 1
-            print(f"[{self.department}] parse failure on {url}: {e}")
-            logger.error(
-                f"[{self.department}] Parse failure",
-                extra={"url":url, "error": str(e)},
-            )
-            return None, None
+            self._record_failure(url, e)
+            return None
+
+        #parse succeeded so the validators and fingerprint can be trusted on the next run
+        self._confirm(url)
+        if url in self._pending_fingerprints:
+            self.fresh_fingerprints[url] = self._pending_fingerprints.pop(url)
+
+        self.records_parsed += 1
+        if record.get("email"):
+            self.email_count += 1
+
+        return self._normalize(record)
 
 
 
 
-    async def scrape(self) -> tuple[list[dict], list[dict]]:
+    def _confirm(self, url: str) -> None:
+        """promotes the validators a page was fetched with once its stored record is known to be up to date"""
+        if url in self._pending_validators:
+            self.fresh_validators[url] = self._pending_validators.pop(url)
+
+
+
+
+    def _record_failure(self, url: str, e: Exception) -> None:
+        #a page that couldn't be fetched counts as a parse failure as well, it yields no record
+        self.parse_failures += 1
+        print(f"[{self.department}] parse failure on {url}: {e}")
+        logger.error(
+            f"[{self.department}] Parse failure",
+            extra={"url":url, "error": str(e)},
+        )
+
+
+
+
+    async def _parse(self, html: str | bytes, url: str) -> dict:
+        """
+        Runs parse_faculty_page in the parse pool, the event loop keeps serving fetches meanwhile
+        """
+        if self.parse_executor is None:
+            return self.parse_faculty_page(html, url)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.parse_executor, parse_in_worker, type(self), html, url, self.parser_backend
+        )
+
+
+
+
+    async def scrape(self, sink=None) -> tuple[list[dict], list[dict]] | None:
         """This executes the full scraping workflow for a department
 
 
             Discovers all faculty profile URLs
-            Scrapes all pages concurrently
-            Collects both raw HTML captures and normalized faculty records
+            Fetches and parses the pages in a staged pipeline
+            Hands the raw HTML captures and normalized faculty records to sink in micro batches
         
-        Returns :
+        The stages (discover -> fetch -> parse -> write) are connected by bounded queues and each runs a 
+        fixed number of workers, so a stage that falls behind makes the ones before it wait instead of 
+        piling pages up in memory, and at most a few batches of html are held at any time however big the 
+        department is
+
+        sink is an async callable taking (raw_pages, records), called with up to WRITE_BATCH_SIZE pages 
+        at a time while fetching continues. Without a sink everything is collected and returned :
             raw_pages: lossless HTML Captures for reproducibility 
             records: normalized faculty records 
+
+        Discovery runs once, the profile urls it found are left in self.faculty_urls
         """
 
         logger.info(f"[{self.department}] Starting scrape")
 
-        try:
-            
-            #obtains all faculty profile urls from directory page
-            urls = await self.get_faculty_links()
-
-            #creates one scraping task per URL, the tasks run concurrently and are rate-limited
-            #by semaphore in fetch_page()
-            tasks = [self._scrape_one(url) for url in urls]
-
-            #executes all scraping tasks concurrently and wait for completion
-            results = await asyncio.gather(*tasks)
+        raw_pages = []
+        records = []
 
+        async def collect(raw_batch, record_batch):
+            raw_pages.extend(raw_batch)
+            records.extend(record_batch)
 
+        try:
 
-            raw_pages = []
-            records = []
-
+            #a department whose host is known to challenge HTTP needs the browser anyway,
+            #so chromium starts up while the directory is being discovered
+            if self.router.prefers_browser(self.BASE_URL):
+                logger.info(f"[{self.department}] launching browser early, host is routed to the browser")
+                self._browser_warmup = asyncio.create_task(self.browser.get_browser())
 
-            #Appends raw html files and records to respective lists
-            #failed scraped are skipped and returned as None
-            for raw, record in results:
-                if raw:
-                    raw_pages.append(raw)  
-                if record:
-                    records.append(record)   
+            await self._run_pipeline(sink or collect)
 
-            return raw_pages, records       
+            return None if sink else (raw_pages, records)
 
         finally:
+            #lets an early browser launch finish (or fail) before tearing it down
+            if self._browser_warmup:
+                await asyncio.gather(self._browser_warmup, return_exceptions=True)
+                self._browser_warmup = None
+
             await self.close()
 
             logger.info(
             f"[{self.department}] Finished scrape | "
+            f"urls={len(self.faculty_urls)} "
             f"pages={self.pages_fetched} "
             f"http={self.http_fetches} "
             f"browser={self.browser_fetched} "
+            f"unchanged={self.pages_unchanged} "
+            f"retries={self.http_retries} "
             f"parse_failures={self.parse_failures}"
 )
 
@@ -251,6 +715,86 @@ class FacultyScraper(ABC):
 
 
 
+    async def _run_pipeline(self, sink) -> None:
+        """
+        Runs the discover -> fetch -> parse -> write stages until every discovered profile is written
+
+        Each stage tells the next one it is done by putting one _DONE per worker of the next stage on its
+        queue. If any stage fails, the others are cancelled and the error is raised
+        """
+        fetch_workers = self.FETCH_WORKERS or self.http_limiter.max_limit
+        parse_workers = self.PARSE_WORKERS or ((os.cpu_count() or 1) if self.parse_executor else 1)
+
+        #profile pages are fetched as soon as discovery yields them, while the rest of the directory is still
+        #being read. The fetches are rate-limited by the per host limiters in fetch_page()
+        urls = asyncio.Queue(maxsize=fetch_workers)
+        pages = asyncio.Queue(maxsize=parse_workers * 2)
+        results = asyncio.Queue(maxsize=self.WRITE_BATCH_SIZE * 2)
+
+        async def discover():
+            async for url in self._discover():
+                self.faculty_urls.append(url)
+                await urls.put(url)
+
+            for _ in range(fetch_workers):
+                await urls.put(_DONE)
+
+        async def fetch():
+            while (url := await urls.get()) is not _DONE:
+                raw_page = await self._fetch_profile(url)
+                if raw_page:
+                    await pages.put(raw_page)
+
+        async def parse():
+            while (raw_page := await pages.get()) is not _DONE:
+                #unchanged content still gets its snapshot row, only the parse and the record write are skipped
+                if await self._content_unchanged(raw_page):
+                    await results.put((raw_page, None))
+                    continue
+
+                record = await self._parse_profile(raw_page)
+                if record:
+                    await results.put((raw_page, record))
+
+        async def stage(worker, count: int, queue: asyncio.Queue, followers: int):
+            await asyncio.gather(*(worker() for _ in range(count)))
+            for _ in range(followers):
+                await queue.put(_DONE)
+
+        async def write():
+            #failed pages are skipped, only pages that made it to a record (or whose record is unchanged) are stored
+            batch = []
+            while (result := await results.get()) is not _DONE:
+                batch.append(result)
+                if len(batch) >= self.WRITE_BATCH_SIZE:
+                    await sink([raw for raw, _ in batch], [record for _, record in batch if record])
+                    batch = []
+
+            if batch:
+                await sink([raw for raw, _ in batch], [record for _, record in batch if record])
+
+        tasks = [
+            asyncio.create_task(discover()),
+            asyncio.create_task(stage(fetch, fetch_workers, pages, parse_workers)),
+            asyncio.create_task(stage(parse, parse_workers, results, 1)),
+            asyncio.create_task(write()),
+        ]
+
+        try:
+            await asyncio.gather(*tasks)
+
+        finally:
+            #a failed stage leaves the others waiting on their queues, don't leave them running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+
+
+
+
+
     ###------------------------------------------------------------------------------------------------###
 
     ### output consistency
@@ -292,120 +836,301 @@ class FacultyScraper(ABC):
     def clean_url(self, base: str, path: str) -> str:
         """Safely joins base URL and path"""
         return urljoin(base,path)
-    
+
 
 
 ###------------------------------------------------------------------------------------------------###
 
-    ### Playwright Functions for browser scraping when requests fail, utilizing async as well
+    ### html parsing
 
 ###------------------------------------------------------------------------------------------------###
+
+
+
+    def parse_html(self, html: str | bytes, regions: tuple[str, ...] | None = None):
+        """
+        Parses html with the scraper's parser backend, the department parsers only go through the 
+        returned node's BeautifulSoup-like api so they work the same on every backend
+
+        With regions only those parts of the page are built into a tree (see html_backends.parse_html)
+        """
+        return parse_html(html, self.parser_backend, regions)
+
+
+
+    def directory_links(self, html: str | bytes, prefix: str) -> list[str]:
+        """
+        Profile urls linked from a directory page, the hrefs starting with prefix joined onto BASE_URL
+
+        The page is only tokenized, no tree is built since nothing but the links is read
+        """
+        return [self.BASE_URL + href for href in extract_links(html, prefix)]
     
 
-    def _is_cloudflare_block(self, response_text: str) -> bool:
+
+###------------------------------------------------------------------------------------------------###
+
+    ### conditional GET revalidation
+
+###------------------------------------------------------------------------------------------------###
+
+
+
+    def _conditional_headers(self, url: str) -> dict:
         """
-        this is a helper function for the get_pages function. This checks to see if there is a cloudflare block 
-        on the website when we are trying to scrape html through the requests package. The Computer Science department
-        for example blocks http clients through cloudflare to prevent bots. If the response_text contains
-        cloudflare response of "just a moment" or "cloudflare" then it will return true and utilize another scraping method
-        specifically playwright which launches a real browser, runs javascript, and passes bot checks, although I must 
-        keep in mind that is is slower and more computationally expensive, so always starting of with a .requests.
-        """
-        return (
-            "Just a moment" in response_text or "cloudflare" in response_text.lower()
-        )
+        Builds the If-None-Match / If-Modified-Since headers from the validators stored for a url
+        """
+        cached = self.validators.get(url)
+        if not cached:
+            return {}
+
+        headers = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        return headers
+
 
 
+    def _remember_validators(self, url: str, response_headers) -> None:
+        """
+        Holds on to the ETag / Last-Modified of a fresh response until the page has been parsed
+        """
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
 
+        if etag or last_modified:
+            self._pending_validators[url] = {"etag": etag, "last_modified": last_modified}
 
 
 
+###------------------------------------------------------------------------------------------------###
+
+    ### HTTP client
 
-    async def _playwright_page_scraper(self, url: str) -> str:
+###------------------------------------------------------------------------------------------------###
+
+
+
+    def _get_client(self) -> httpx.AsyncClient:
         """
-        This is the playwright scraper which utilizes real browser and mimics real user bypassing cloudflare restrictions
+        initializes and returns the shared async HTTP client
+
+        The client keeps a pool of keep-alive connections per host so every profile page on the same 
+        department site reuses an open connection, and when h2 is installed the requests are multiplexed 
+        over a single HTTP/2 connection instead
         """
-        
-        #gets or reuses a shared Chromium browser instance
-        browser = await self._get_browser()
 
-        #opens a page/tab in the browser
-        page = await browser.new_page()
+        #if client hasn't been created yet, create it
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": self.USER_AGENT},
+                timeout=httpx.Timeout(10.0),
+                follow_redirects=True,
+                http2=self.http2,
+                #the per host limiter decides how many requests are in flight, the pool just keeps them alive
+                limits=httpx.Limits(
+                    max_connections=None,
+                    max_keepalive_connections=self.http_limiter.max_limit,
+                ),
+            )
 
+        return self._client
 
-        #Goes to the target url and waits until the initial html is loaded and parsed
-        await page.goto(url, wait_until="domcontentloaded", timeout = 60000)
 
-        #Some of the faculty pages (computer science) can't be used until a specific element appears
-        # if this is a faculty page, wait for the page tittle to confirm the real content has loaded
-        if "/faculty/" in url:
-            await page.wait_for_selector("h1.page_title", timeout=10000)
 
-        # pull the html from the rendered page
-        html = await page.content()
+    async def _fetch_robots(self, robots_url: str) -> str | None:
+        """
+        Returns the text of a host's robots.txt, or None if it is missing or hidden behind a challenge
+        """
+        r = await self._get_client().get(robots_url)
 
-        #close the tab to free resources, the browser stays open
-        await page.close()
+        if r.status_code != 200 or self._is_cloudflare_block(r):
+            return None
 
+        return r.text
 
-        return html
+
+
+###------------------------------------------------------------------------------------------------###
+
+    ### Playwright Functions for browser scraping when requests fail, utilizing async as well
+
+###------------------------------------------------------------------------------------------------###
     
 
+    def _is_cloudflare_block(self, response: httpx.Response) -> bool:
+        """
+        this is a helper function for the get_pages function. This checks to see if there is a cloudflare block 
+        on the website when we are trying to scrape html through the HTTP client. The Computer Science department
+        for example blocks http clients through cloudflare to prevent bots. If the response is a cloudflare 
+        challenge then it will return true and utilize another scraping method specifically playwright which 
+        launches a real browser, runs javascript, and passes bot checks, although I must keep in mind that is is 
+        slower and more computationally expensive, so always starting of with a plain HTTP request.
+
+        Cloudflare flags its challenges with a cf-mitigated header, older interstitials are recognised by the
+        markers in their <head>, so only the first BLOCK_SCAN_BYTES of the body are looked at, as bytes
+        """
+        if response.headers.get("cf-mitigated", "").lower() == "challenge":
+            return True
+
+        head = response.content[:self.BLOCK_SCAN_BYTES]
+        return any(marker in head for marker in self._challenge_markers())
+
+
+
+
+
+
+
+    @classmethod
+    def _challenge_markers(cls) -> tuple[bytes, ...]:
+        #the markers are ascii, so they can be looked for in the raw bytes of any ascii compatible encoding
+        return tuple(marker.encode() for marker in cls.CHALLENGE_MARKERS)
+
+
+
+    def _is_challenge_page(self, html: str) -> bool:
+        """
+        Stricter check than _is_cloudflare_block for browser rendered pages, a page that passed the challenge
+        still loads Cloudflare scripts (and mentions "cloudflare"), only the interstitial itself has these markers
+        """
+        return any(marker in html for marker in self.CHALLENGE_MARKERS)
+
+
+
+    async def _playwright_page_scraper(self, url: str, ready_selector: str | None = None) -> str:
+        """
+        This is the playwright scraper which utilizes real browser and mimics real user bypassing cloudflare restrictions
+
+        The browser runs headless first, if a page is still stuck on a challenge headless the browser is 
+        relaunched headed (when there is a display to show it on) and the page is tried once more
+        """
+        for attempt in range(2):
+            generation = self.browser.generation
+
+            try:
+                return await self._render_page(url, ready_selector)
 
+            except BotChallengeError:
+                if attempt == 0 and await self.browser.escalate(generation):
+                    continue
+                raise
 
+            except PlaywrightError:
+                #another page (possibly of another department) relaunched the browser underneath this one
+                if attempt == 0 and generation != self.browser.generation:
+                    continue
+                raise
 
 
-    async def _get_browser(self):
+
+    async def _render_page(self, url: str, ready_selector: str | None) -> str:
         """
-        initializes and returns a playwright browser instance
+        Loads a page in a pooled tab and returns the rendered html
 
-        The browser is created once per scraper run and is reused across multiple pages to avoid 
-        the computational cost of reopening a new browser after each request
+        Pages are borrowed from a pool instead of opening a new tab per url. If ready_selector is given the 
+        page is only read once that element appears, if it never does the page is still used unless it is 
+        stuck on a Cloudflare challenge
         """
+        #borrows a tab from the department's pool, it goes back to the pool afterwards and the browser stays open
+        pool = self.browser.pool(self.department, size=self.browser_limiter.max_limit)
+        async with pool.page() as page:
 
-        #if browser hasn't been cerated yet, launch it
-        if self._browser is None:
-            logger.info("[playwright] Launching browser")
+            #Goes to the target url and waits until the initial html is loaded and parsed
+            await page.goto(url, wait_until="domcontentloaded", timeout=self.NAVIGATION_TIMEOUT_MS)
 
-            #this starts the playwright engine
-            self._playwright = await async_playwright().start()
+            #Some of the faculty pages (computer science) can't be used until a specific element appears
+            #the department's readiness selector confirms the real content has loaded
+            if ready_selector:
+                try:
+                    await page.wait_for_selector(ready_selector, timeout=self.READY_TIMEOUT_MS)
+                except PlaywrightTimeoutError:
+                    logger.info(f"[{self.department}] {ready_selector!r} never appeared on {url}, using page as is")
 
+            # pull the html from the rendered page
+            html = await page.content()
 
-            
-            #launches chromium browser. headless= false means that the browser will pop up visibly in runs 
-            #which actually passes the cloudflare bot detection test like in the computer science faculty page
-            #If I do this on EC2, it could work without having an UI pop up on the screen
-            self._browser = await self._playwright.chromium.launch(headless=False)
+            #challenge pages have their own <h1>, so even a matched selector doesn't prove the challenge was passed
+            if self._is_challenge_page(html):
+                raise BotChallengeError(f"Cloudflare challenge not solved for {url}")
 
-        #returns the exiting browser instance
-        return self._browser
-    
+            #copies a fresh clearance over so the host's next pages can go over plain HTTP
+            if not self.router.has_clearance(url):
+                await self._hand_off_clearance(page, url)
 
+        return html
 
 
 
-    async def close(self):
+    def _budget_slot(self, budget):
+        """
+        Holds one slot of a global run budget for this department, or nothing when running without one
         """
-        shuts down playwright resources when finished
+        return budget.slot(self.department) if budget else nullcontext()
+
+
 
+    async def _hand_off_clearance(self, page, url: str) -> None:
         """
-        #close chromium if exists
-        if self._browser:
-            await self._browser.close()
-            self._browser = None
+        Exports the browser's Cloudflare clearance cookies and user agent to the router
+
+        Once Playwright has passed the challenge the host's cookies (cf_clearance and friends) and the
+        browser's user agent are recorded as the host's clearance in the router, which every department
+        shares. Each department's HTTP client copies the cookies into its cookie jar and sends the user
+        agent (_apply_clearance). The router serves the host over HTTP until the clearance expires or gets
+        challenged, at which point the host goes back to the browser and the next browser page hands over
+        a new clearance.
+        """
+        cookies = await page.context.cookies([url])
+        clearance = next((c for c in cookies if c["name"] == self.CLEARANCE_COOKIE), None)
 
-        #stop playwright engine if exists
-        if self._playwright:    
-            await self._playwright.stop()
-            self._playwright = None
+        #no challenge was passed on this host, nothing to hand over
+        if clearance is None:
+            return
 
-        logger.info(f"[{self.department}] shutting down Playwright resources")
+        user_agent = await page.evaluate("navigator.userAgent")
 
-        
-        
+        #session cookies report an expiry of -1
+        expires = clearance.get("expires", -1)
+        if not expires or expires <= 0:
+            expires = time.time() + self.DEFAULT_CLEARANCE_TTL
+
+        self.router.record_clearance(url, expires, cookies, user_agent)
+
+
+
+    def _apply_clearance(self, client: httpx.AsyncClient, url: str, clearance: dict) -> None:
+        """Copies the cookies of a clearance into the HTTP client, once per clearance"""
+        host = host_of(url)
+        if self._applied_clearances.get(host) is clearance:
+            return
 
+        for cookie in clearance["cookies"]:
+            client.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie.get("path", "/"))
+        self._applied_clearances[host] = clearance
 
 
-                
 
+    async def close(self):
+        """
+        shuts down the HTTP client and playwright resources when finished
+
+        """
+        #close the HTTP connection pool if exists
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+            self._applied_clearances.clear()
+
+        #close the department's pooled pages and their context, a shared browser stays up for the other
+        #departments and is shut down once by run.py
+        await self.browser.release_pool(self.department)
+
+        if self._owns_browser:
+            await self.browser.close()
+
+        logger.info(f"[{self.department}] shutting down Playwright resources")
 
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+#resources a faculty page doesn't need to render its text, aborting them saves most of the page weight
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+
+#analytics and tracking scripts, scripts in general are left alone since the Cloudflare challenge needs them
+BLOCKED_URL_FRAGMENTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "siteimprove.com",
+    "siteimproveanalytics",
+    "clarity.ms",
+    "nr-data.net",
+)
+
+
+
+class PagePool:
+    """
+    Pool of reusable Playwright pages inside one browser context
+
+    Instead of opening and closing a tab per url, up to size pages are created on demand and handed
+    back out for the next url. The context aborts images, fonts, stylesheets, media and analytics
+    requests so only the document and the scripts it needs are downloaded. Since all pages share the
+    context they also share its cookies, so a Cloudflare clearance earned on one page carries over.
+
+    With a storage_state_path the context starts from the cookies and local storage saved by an earlier
+    run, and saves them back when the pool is closed, so Cloudflare trust survives between runs.
+    """
+
+    def __init__(self, get_browser, size: int, storage_state_path: str | None = None):
+        #async callable returning the (lazily launched) browser
+        self._get_browser = get_browser
+        self.size = size
+        self.storage_state_path = storage_state_path
+
+        self._context = None
+        self._context_lock = asyncio.Lock()
+        self._sem = asyncio.Semaphore(size)
+        self._idle = []
+
+
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        Borrows a page, it goes back to the pool if the block finishes cleanly and is discarded otherwise
+        """
+        async with self._sem:
+            page = self._idle.pop() if self._idle else await self._new_page()
+            reusable = False
+
+            try:
+                yield page
+                reusable = True
+
+            finally:
+                if reusable and not page.is_closed():
+                    self._idle.append(page)
+                else:
+                    await _close_quietly(page)
+
+
+
+    async def close(self):
+        """
+        closes the context and every page in it
+        """
+        self._idle.clear()
+
+        if self._context:
+            await self.save_storage_state()
+            await _close_quietly(self._context)
+            self._context = None
+
+
+
+    async def save_storage_state(self):
+        """
+        writes the context's cookies and local storage to storage_state_path
+
+        Several departments' contexts share the file, so the context's state is merged into what is
+        already saved instead of replacing it, entries of this context win over older ones
+        """
+        if not (self._context and self.storage_state_path):
+            return
+
+        try:
+            state = await self._context.storage_state()
+            state = _merge_storage_state(_read_storage_state(self.storage_state_path), state)
+
+            with open(self.storage_state_path, "w") as f:
+                json.dump(state, f)
+
+            logger.info(f"[playwright] saved browser storage state to {self.storage_state_path}")
+        except Exception as e:
+            logger.warning(f"[playwright] could not save browser storage state ({e})")
+
+
+
+    async def _new_page(self):
+        context = await self._get_context()
+        return await context.new_page()
+
+
+
+    async def _get_context(self):
+        async with self._context_lock:
+            if self._context is None:
+                browser = await self._get_browser()
+                self._context = await browser.new_context(
+                    storage_state=load_storage_state(self.storage_state_path)
+                )
+
+                #every request of every page in the context goes through _block_resources first
+                await self._context.route("**/*", _block_resources)
+
+                logger.info(f"[playwright] created browser context | pages<={self.size}")
+
+        return self._context
+
+
+
+
+
+def load_storage_state(path: str | None, max_age: float = 7 * 24 * 3600) -> dict | None:
+    """
+    Reads a saved Playwright storage state, dropping cookies that have already expired
+
+    Returns None (a fresh context) if there is no file, it is older than max_age seconds or it can't be read
+    """
+    if not path or not os.path.exists(path):
+        return None
+
+    if time.time() - os.path.getmtime(path) > max_age:
+        logger.info(f"[playwright] ignoring stale browser storage state {path}")
+        return None
+
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"[playwright] could not read browser storage state {path} ({e})")
+        return None
+
+    #session cookies have an expiry of -1 and are kept
+    now = time.time()
+    state["cookies"] = [c for c in state.get("cookies", []) if c.get("expires", -1) <= 0 or c["expires"] > now]
+
+    logger.info(f"[playwright] loaded browser storage state from {path} | cookies={len(state['cookies'])}")
+    return state
+
+
+
+def _read_storage_state(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+
+def _merge_storage_state(saved: dict, state: dict) -> dict:
+    """
+    Merges state into saved, cookies are matched on (name, domain, path) and local storage on origin
+    """
+    cookies = {(c["name"], c["domain"], c.get("path", "/")): c for c in saved.get("cookies", [])}
+    cookies.update({(c["name"], c["domain"], c.get("path", "/")): c for c in state.get("cookies", [])})
+
+    origins = {o["origin"]: o for o in saved.get("origins", [])}
+    origins.update({o["origin"]: o for o in state.get("origins", [])})
+
+    return {"cookies": list(cookies.values()), "origins": list(origins.values())}
+
+
+
+async def _block_resources(route):
+    """
+    Aborts non-document resources and analytics, lets everything else through
+    """
+    request = route.request
+
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(
+        fragment in request.url for fragment in BLOCKED_URL_FRAGMENTS
+    ):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+
+async def _close_quietly(closable):
+    try:
+        await closable.close()
+    except Exception as e:
+        logger.debug(f"[playwright] ignoring error on close ({e})")
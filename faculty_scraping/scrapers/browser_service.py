@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+import sys
+
+from playwright.async_api import async_playwright
+
+from .browser_pool import PagePool
+
+logger = logging.getLogger(__name__)
+
+
+
+class BrowserService:
+    """
+    Run-scoped Chromium shared by every department scraper
+
+    run.py creates one service for the whole run and shuts it down once at the end of main(), so a
+    multi department run launches Chromium once instead of once per scraper. Each department borrows
+    pages from its own PagePool, which lives in its own browser context, so cookies and storage stay
+    isolated between departments.
+
+    Chromium is launched headless first. If a page is still stuck on a challenge headless, escalate()
+    relaunches it headed (when there is a display to show it on). The generation counts relaunches so
+    pages caught in one can tell and retry.
+    """
+
+    def __init__(self, headless: bool = True, storage_state_path: str | None = None):
+        self.headless = headless
+
+        #cookies and local storage of the browser contexts are saved here between runs
+        self.storage_state_path = storage_state_path
+
+        self.generation = 0
+
+        self._playwright = None
+        self._browser = None
+        self._pools: dict[str, PagePool] = {}
+
+        #the lock stops concurrent first uses (and the early launch task) from all starting chromium
+        self._lock = asyncio.Lock()
+
+
+
+    async def get_browser(self):
+        """
+        initializes and returns the playwright browser instance
+
+        The browser is created once per run and is reused across all departments and pages to avoid
+        the computational cost of reopening a new browser
+        """
+        async with self._lock:
+            #if browser hasn't been cerated yet, launch it
+            if self._browser is None:
+                logger.info("[playwright] Launching browser")
+
+                #this starts the playwright engine
+                self._playwright = await async_playwright().start()
+
+                #launches chromium browser, headless first so runs work on servers without a display (EC2),
+                #escalate() switches to headless=False, which pops up visibly but passes the
+                #cloudflare bot detection test like in the computer science faculty page
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+
+        #returns the exiting browser instance
+        return self._browser
+
+
+
+    def pool(self, key: str, size: int) -> PagePool:
+        """
+        Returns the page pool (and so the browser context) of a department, creating it on first use
+        """
+        if key not in self._pools:
+            self._pools[key] = PagePool(self.get_browser, size=size, storage_state_path=self.storage_state_path)
+
+        return self._pools[key]
+
+
+
+    async def release_pool(self, key: str) -> None:
+        """
+        Closes a department's context once it is done, saving its storage state, the browser stays up
+        """
+        pool = self._pools.pop(key, None)
+        if pool:
+            await pool.close()
+
+
+
+    async def escalate(self, generation: int) -> bool:
+        """
+        Relaunches chromium headed after a challenge wasn't passed headless
+
+        Returns True if the page should be retried, either because this call relaunched the browser or
+        another page already did since generation. Returns False when already headed or there is no
+        display to run a headed browser on.
+        """
+        async with self._lock:
+            if generation != self.generation:
+                return True
+
+            if not self.headless or not _has_display():
+                return False
+
+            logger.warning("[playwright] challenge not passed headless, relaunching browser headed")
+
+            #bumped before closing, pages failing with the close in progress already see the new generation
+            #and retry instead of raising, their relaunch waits on the lock until the close is done
+            self.headless = False
+            self.generation += 1
+
+            #closing the pools saves the storage state, the headed contexts start from it
+            await self._close_browser()
+
+        return True
+
+
+
+    async def close(self) -> None:
+        """
+        shuts down playwright resources when the run is finished
+        """
+        async with self._lock:
+            await self._close_browser()
+
+            #stop playwright engine if exists
+            if self._playwright:
+                await self._playwright.stop()
+                self._playwright = None
+
+        logger.info("[playwright] shut down browser")
+
+
+
+    async def _close_browser(self) -> None:
+        #close the pooled pages and their contexts
+        for pool in self._pools.values():
+            await pool.close()
+        self._pools.clear()
+
+        #close chromium if exists
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+
+
+
+
+
+def _has_display() -> bool:
+    """True if a headed browser has somewhere to open its window"""
+    return sys.platform in ("darwin", "win32") or bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
@@ -1,6 +1,6 @@
 import string
-from bs4 import BeautifulSoup
 from .base import FacultyScraper
+from .extract import NextSibling, Text, Texts
 import asyncio
 
 
@@ -14,8 +14,8 @@ class ComputerScienceScraper(FacultyScraper):
     2. Parsing individual faculty profile pages
     """
 
-    def __init__(self, run_id: str):
-        super().__init__(run_id)
+    def __init__(self, run_id: str, **kwargs):
+        super().__init__(run_id, **kwargs)
         self.department = "Computer Science"
     
     # department = "Computer Science"
@@ -25,6 +25,22 @@ class ComputerScienceScraper(FacultyScraper):
     
     BASE_URL = "https://engineering.virginia.edu"
 
+    #profile pages sit behind a Cloudflare challenge until the title renders
+    PROFILE_READY_SELECTOR = "h1.page_title"
+    DIRECTORY_READY_SELECTOR = "a[href^='/faculty/']"
+
+    #profile page fields, all found in one pass over the page by the base class's parse_faculty_page
+    FIELDS = {
+        "name": Text("h1.page_title"),
+        "title": Texts("span.page_intro_position_label", join="; "),
+
+        #the paragraph under the "About" heading
+        "bio": NextSibling("h2", string=lambda s: s == "About"),
+
+        "expertise": Texts("div.directory_grid_item"),
+        "email": Text("a[href^='mailto:']"),
+    }
+
     async def get_faculty_links(self) -> list[str]:
         """
         Returns sorted list of all Computer Science faculty profile URLs
@@ -37,74 +53,8 @@ class ComputerScienceScraper(FacultyScraper):
         #html of faculty listing, inherited from FacultyScraper, ignoring tuple value (html, fetch_method <-ignored)
         html, _ = await self.fetch_page(url)
 
-        soup = BeautifulSoup(html, "html.parser")
-
-        #grabs all the faculty urls in one page
-        for a in soup.select("a[href^='/faculty/']"):
-                links.add(self.BASE_URL + a["href"])
+        #grabs all the faculty urls in one page, the page is only tokenized since the links are all that's read
+        links.update(self.directory_links(html, "/faculty/"))
         
 
         return sorted(links)
-    
-    
-    def parse_faculty_page(self, html, url):
-        """
-        Extracts the normalized faculty data within a single computer science faculty profile page
-
-        Args:
-            html: the raw HTML of the faculty profile page
-            url: The profile page (for context and debugging)
-
-        Returns:
-            A dictionary with all the normalized faculty fields
-        """
-
-        soup = BeautifulSoup(html, "html.parser")
-
-        name_tag = soup.find("h1", class_="page_title")
-        name = name_tag.get_text(strip=True) if name_tag else None
-
-        title_tags = soup.find_all("span", class_="page_intro_position_label")
-        titles = [tag.get_text(strip=True) for tag in title_tags]
-        title = "; ".join(titles) if titles else None
-
-        bio_header = soup.find("h2", string="About")
-        bio_tag = bio_header.find_next_sibling("p") if bio_header else None
-        bio = bio_tag.get_text(" ", strip = True) if bio_tag else None
-
-        expertise_tags = soup.find_all("div", class_="directory_grid_item")
-        expertise = (
-             [tag.get_text(strip=True) for tag in expertise_tags]
-             if expertise_tags else None
-        )
-
-
-        email_link = soup.select_one("a[href^='mailto:']")
-        email = email_link.get_text(strip=True) if email_link else None
-
-
-        #Normalizing the fields into a clean dictionary, missing fields stored as none
-        info: dict = {
-            "name": name,
-            "title": title,
-            "bio": bio,
-            "expertise": expertise,
-            "email": email,
-        }
-        
-        return info
-
-
-    
-
-
-
-       
-
-    
-
-
-        
-
-
-
@@ -1,6 +1,7 @@
 import string
-from bs4 import BeautifulSoup
+import asyncio
 from .base import FacultyScraper
+from .extract import Attr, Text, Texts
 
 
 class DataScienceScraper(FacultyScraper):
@@ -13,8 +14,8 @@ class DataScienceScraper(FacultyScraper):
     2. Parsing individual faculty profile pages
     """
 
-    def __init__(self, run_id: str):
-        super().__init__(run_id)
+    def __init__(self, run_id: str, **kwargs):
+        super().__init__(run_id, **kwargs)
         self.department = "Data Science"
         
 
@@ -29,83 +30,62 @@ class DataScienceScraper(FacultyScraper):
     #The directory pages are organized alphabetically by last name
     DIRECTORY_URL = BASE_URL + "/faculty-research?letter="
 
+    #some letters have no faculty, so directory pages are read without waiting for a link
+    PROFILE_READY_SELECTOR = "h1"
 
+    #profile page fields, all found in one pass over the page by the base class's parse_faculty_page
+    FIELDS = {
+        #the name of the faculty is consistently stored in the <h1> tag
+        "name": Text("h1", separator=" "),
+        "title": Text("div.field--title"),
 
-    async def get_faculty_links(self) -> list[str]:
-        """
-        Returns a sorted list of all Data Science faculty profile URLs by iterating
-        through the A-Z directory pages
-        """
+        #matches the whole class attribute, like find(class_="field--bio field--body") did
+        "bio": Text("div[class='field--bio field--body']"),
 
-        #prevents duplicates across directory pages
-        links = set()
+        "expertise": Texts("div.list-text"),
 
-        #for every directory page per letter A-Z
-        for letter in string.ascii_uppercase:
+        #the person section allows for only the person field to be considered, not the links and info at the bottom
+        "email": Attr("section.person a[href^='mailto:']", "href", post=lambda href: href.replace("mailto:", "")),
+    }
 
-            url = self.DIRECTORY_URL + letter
 
-            #html of faculty listing, inherited from FacultyScraper, ignoring tuple value (html, fetch_method <-ignored)
-            html, _ = await self.fetch_page(url)
-            
-            
-            soup = BeautifulSoup(html, "html.parser")
 
-            #grabs all the faculty urls in one page
-            for a in soup.select("a[href^='/people/']"):
-                links.add(self.BASE_URL + a["href"])
+    async def get_faculty_links(self) -> list[str]:
+        """
+        Returns a sorted list of all Data Science faculty profile URLs from the A-Z directory pages
+        """
+        return sorted([link async for link in self.iter_faculty_links()])
+
 
-        return sorted(links)
-    
-    
 
-    def parse_faculty_page(self, html: str, url: str) -> dict:
+    async def iter_faculty_links(self):
         """
-        Extracts the normalized faculty data within a single data science faculty profile page
+        Yields Data Science faculty profile URLs as the A-Z directory pages come in
 
-        Args:
-            html: the raw HTML of the faculty profile page
-            url: The profile page (for context and debugging)
-
-        Returns:
-            A dictionary with all the normalized faculty fields
+        All 26 letter pages are requested at once (the host limiter decides how many are actually in 
+        flight) and each page's links are yielded as soon as that page arrives, in whatever order the 
+        pages finish
         """
 
-        soup = BeautifulSoup(html, "html.parser")
+        #prevents duplicates across directory pages
+        links = set()
+
+        #one fetch per directory page per letter A-Z, inherited from FacultyScraper
+        pages = [asyncio.create_task(self.fetch_page(self.DIRECTORY_URL + letter)) for letter in string.ascii_uppercase]
 
+        try:
+            for next_page in asyncio.as_completed(pages):
 
-        #the name of the faculty is consistently stored in the <h1> tag
-        name_tag = soup.find("h1")
-        name = " ".join(name_tag.stripped_strings) if name_tag else None
-
-        title_tag = soup.select_one("div.field--title")
-        title = title_tag.get_text(strip=True) if title_tag else None
-
-        #pulls the bio text
-        bio_tag = soup.find("div", class_="field--bio field--body")
-        bio = bio_tag.get_text(strip=True) if bio_tag else None
-
-        #pulls the expertise text
-        expertise_tags = soup.find_all("div", class_="list-text")
-        expertise = ([t.get_text(strip=True) for t in expertise_tags] if expertise_tags else None)
-
-        #pulls the email, the person section allows for only the person field to be considered, not the links and info at the bottom
-        email_link = soup.select_one("section.person a[href^='mailto:']")
-        email = (email_link["href"].replace("mailto:", "") if email_link else None)
-
-    
-
-        #Normalizing the fields into a clean dictionary, missing fields stored as none
-        info: dict = {
-            "name": name,
-            "title": title,
-            "bio": bio,
-            "expertise": expertise,
-            "email": email,
-        }
-        
-        return info
-    
+                #html of faculty listing, ignoring tuple value (html, fetch_method <-ignored)
+                html, _ = await next_page
 
+                #grabs all the new faculty urls in one page, the page is only tokenized, no tree is built
+                for link in self.directory_links(html, "/people/"):
+                    if link not in links:
+                        links.add(link)
+                        yield link
 
-    
\ No newline at end of file
+        finally:
+            #a failed page or a consumer that stopped early leaves the other letters unfinished
+            for page in pages:
+                page.cancel()
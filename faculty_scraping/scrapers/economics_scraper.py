@@ -1,7 +1,6 @@
 import string
-from bs4 import BeautifulSoup
 from .base import FacultyScraper
-from bs4 import NavigableString
+from .extract import SectionText, Text, TextAfterLabels, Texts, collapse_whitespace
 
 
 class EconomicsScraper(FacultyScraper):
@@ -15,8 +14,8 @@ class EconomicsScraper(FacultyScraper):
     """
 
 
-    def __init__(self, run_id: str):
-        super().__init__(run_id)
+    def __init__(self, run_id: str, **kwargs):
+        super().__init__(run_id, **kwargs)
         self.department = "Economics"
 
     # department = "Economics"
@@ -27,6 +26,28 @@ class EconomicsScraper(FacultyScraper):
     #each faculty url begins with this base url
     BASE_URL = "https://economics.virginia.edu"
 
+    PROFILE_READY_SELECTOR = "article.container h1"
+    DIRECTORY_READY_SELECTOR = "a[href^='/people/']"
+
+    #profile page fields, all found in one pass over the page by the base class's parse_faculty_page
+    FIELDS = {
+        "name": Text("article.container h1 span"),
+        "title": Texts("div.field-field_title", join="; "),
+
+        #the paragraph under an explicit Biography header, without one the body text until the first <h3>
+        "bio": SectionText(
+            "h3",
+            within="div.field-body",
+            string=lambda s: "Biography" in s,
+            post=collapse_whitespace,
+        ),
+
+        #expertise is shown under two different headers titles, "fields of interest" and "research interests"
+        "expertise": TextAfterLabels("h3", labels={"Fields of Interest", "Research Interests"}),
+
+        "email": Text("a[href^='mailto:']"),
+    }
+
 
 
     async def get_faculty_links(self):
@@ -45,120 +66,8 @@ class EconomicsScraper(FacultyScraper):
         #html of faculty listing, inherited from FacultyScraper, ignoring tuple value (html, fetch_method <-ignored)
         html, _ = await self.fetch_page(url)
 
-        soup = BeautifulSoup(html, "html.parser")
-
-        #grabs all the faculty urls in one page
-        for a in soup.select("a[href^='/people/']"):
-            links.add(self.BASE_URL + a["href"])
+        #grabs all the faculty urls in one page, the page is only tokenized since the links are all that's read
+        links.update(self.directory_links(html, "/people/"))
         
 
         return sorted(links)
-    
-
-
-    
-    def parse_faculty_page(self, html, url):
-        """
-        Extracts the normalized faculty data within a single economics faculty profile page
-
-        Args:
-            html: the raw HTML of the faculty profile page
-            url: The profile page (for context and debugging)
-
-        Returns:
-            A dictionary with all the normalized faculty fields
-        """
-
-
-        soup = BeautifulSoup(html, "html.parser")
-
-
-        #scraping the faculty name of faculty
-        name_tag = soup.select_one("article.container h1 span")
-        name = name_tag.get_text(strip=True) if name_tag else None
-
-        #scraping academic titles of faculty
-        title_tags = soup.find_all("div", class_="field-field_title")
-        titles = [tag.get_text(strip=True) for tag in title_tags]
-        title = "; ".join(titles) if titles else None
-
-
-
-        # scraping biographies of faculty
-        body = soup.find("div", class_="field-body")
-        bio = None
-
-        if body:
-            # Case 1: Explicit Biography section
-            bio_header = body.find("h3", string=lambda s: s and "Biography" in s)
-            if bio_header:
-                bio_p = bio_header.find_next_sibling("p")
-                bio = bio_p.get_text(" ", strip=True) if bio_p else None
-
-            # Case 2: No Biography header take text until first <h3>
-            else:
-                bio_parts = []
-                for child in body.children:
-                    if getattr(child, "name", None) == "h3":
-                        break  # this stops it at the first section header
-                    if getattr(child, "get_text", None):
-                        text = child.get_text(" ", strip=True)
-                        if text:
-                            bio_parts.append(text)
-
-                bio = " ".join(bio_parts) if bio_parts else None
-
-        # normalizing whitespace
-        if bio:
-            bio = " ".join(bio.split())
-
-
-
-        #for gathering expertise in shown in two different headers titles, "fields of interest" and "research interests"
-        expertise = []
-
-        for h3 in soup.find_all("h3"):
-            label = h3.get_text(strip=True)
-
-            if label in {"Fields of Interest", "Research Interests"}:
-                for sib in h3.next_siblings:
-                    
-                    if getattr(sib, "name", None) == "h3":
-                        break
-
-                    # capture first meaningful text (got this from LLM)
-                    if isinstance(sib, NavigableString) and sib.strip():
-                        expertise.append(sib.strip())
-                        break
-
-                    if getattr(sib, "get_text", None):
-                        text = sib.get_text(" ", strip=True)
-                        if text:
-                            expertise.append(text)
-                            break
-
-        expertise = expertise if expertise else None
-                
-
-
-
-
-        #scrapes the email of the faculty member
-        email_link = soup.select_one("a[href^='mailto:']")
-        email = email_link.get_text(strip=True) if email_link else None
-
-
-        #Normalizing the fields into a clean dictionary, missing fields stored as none
-        info: dict = {
-            "name": name,
-            "title": title,
-            "bio": bio,
-            "expertise": expertise,
-            "email": email,
-        }
-        
-        return info
-
-
-
-        
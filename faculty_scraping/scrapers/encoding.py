@@ -0,0 +1,90 @@
+"""
+Raw page bytes and their encoding
+
+Pages fetched over HTTP are kept as the bytes the server sent, with the encoding resolved the way a
+browser does it before parsing (byte order mark, then the Content-Type charset, then a <meta> tag in the
+first few KB) instead of decoding the body up front or running charset detection over all of it. The
+bytes are only decoded once, by whoever needs text.
+"""
+
+import codecs
+import re
+
+#how far into the page a <meta charset> is looked for, browsers look at the first 1024 bytes
+META_SCAN_BYTES = 4096
+
+#what pages without any declared encoding are decoded as
+DEFAULT_ENCODING = "utf-8"
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+_HEADER_CHARSET = re.compile(r"""charset\s*=\s*["']?([\w.:-]+)""", re.I)
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
+
+
+
+class PageBytes(bytes):
+    """
+    The body of a fetched page along with the encoding it is to be decoded with
+    """
+
+    def __new__(cls, content: bytes, encoding: str = DEFAULT_ENCODING):
+        page = super().__new__(cls, content)
+        page.encoding = encoding
+        return page
+
+
+    def __reduce__(self):
+        #keeps the encoding when the page is pickled over to a parse worker
+        return (PageBytes, (bytes(self), self.encoding))
+
+
+    def decode(self, encoding: str | None = None, errors: str = "replace") -> str:
+        return super().decode(encoding or self.encoding, errors)
+
+
+
+def as_text(html: str | bytes) -> str:
+    """Browser pages are already text, fetched pages are decoded with their resolved encoding"""
+    if isinstance(html, PageBytes):
+        return html.decode()
+    if isinstance(html, bytes):
+        return html.decode(resolve_encoding(html), "replace")
+    return html
+
+
+
+def resolve_encoding(content: bytes, content_type: str | None = None) -> str:
+    """
+    Returns the encoding of a page from its byte order mark, its Content-Type header or a <meta> tag near
+    the start, in that order, without looking at the rest of the body
+    """
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            return encoding
+
+    if content_type:
+        match = _HEADER_CHARSET.search(content_type)
+        encoding = match and _known(match.group(1))
+        if encoding:
+            return encoding
+
+    match = _META_CHARSET.search(content[:META_SCAN_BYTES])
+    encoding = match and _known(match.group(1).decode("ascii", "replace"))
+    if encoding:
+        #a page that could read its own <meta> isn't utf-16, browsers take utf-8 in that case
+        return "utf-8" if encoding.startswith("utf-16") else encoding
+
+    return DEFAULT_ENCODING
+
+
+
+def _known(label: str) -> str | None:
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
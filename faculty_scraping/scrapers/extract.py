@@ -0,0 +1,418 @@
+"""
+Declarative field rules for profile pages
+
+A department describes each field of its profile pages with a rule (which elements hold it and how
+their text becomes the value) in its FIELDS class attribute. FieldExtractor compiles all the rules of a
+department into one selector group, so the page is walked once for every field instead of once per
+find()/select() call, and each matched element is handed to the rules that asked for it.
+
+Rules take a css selector, an optional within selector (only elements inside the first element matching
+it count, like calling find() on that element) and an optional string predicate (only elements whose
+single string passes it count, like find(..., string=...)). post is applied to a value that was found.
+
+The rules also tell which regions of the page they read (FieldExtractor.regions), so BeautifulSoup only
+has to build the tree for those subtrees. A rule that reads the siblings of an element anywhere in the
+page can't be narrowed down, and then the whole page is parsed.
+"""
+
+import re
+
+#a selector split into compounds and the combinators between them, attribute values may hold spaces
+_SELECTOR_TOKENS = re.compile(r"\s*>\s*|\s+|(?:[^\s>\[]|\[[^\]]*\])+")
+
+#tag.class.class[attr op value]..., anything else (ids, pseudo classes, sibling combinators) goes to the parser
+_COMPOUND = re.compile(r"([a-z][a-z0-9]*)?((?:\.[\w-]+)*)((?:\[[^\]]*\])*)")
+_ATTRIBUTE = re.compile(r"""\[\s*([\w-]+)\s*(?:([\^$*~]?=)\s*(?:'([^']*)'|"([^"]*)"|([^\]\s]*)))?\s*\]""")
+
+
+
+class FieldExtractor:
+    """
+    All the field rules of a department compiled into a single pass over the page
+    """
+
+    def __init__(self, fields: dict):
+        self.fields = fields
+
+        #every selector any rule needs, once each, in one group the parser resolves in a single walk
+        self.selectors = tuple(dict.fromkeys(css for rule in fields.values() for css in rule.selectors))
+        self._group = ", ".join(self.selectors)
+
+        #tag name -> (selector, compiled matcher) for the selectors ending in that tag, so each element is
+        #only checked against the few selectors that can pick it, "*" holds the ones that name no tag
+        self._by_tag = {}
+        for css in self.selectors:
+            tag, matcher = _compile_selector(css)
+            self._by_tag.setdefault(tag, []).append((css, matcher))
+
+        #when every selector names its tag the walk only has to compare tag names
+        self._tags = None if "*" in self._by_tag else list(self._by_tag)
+
+        #the subtrees all the rules together read, None when some rule needs the whole page
+        regions = [rule.regions for rule in fields.values()]
+        self.regions = None if None in regions else tuple(dict.fromkeys(r for rule in regions for r in rule))
+
+
+
+    def extract(self, doc) -> dict:
+        """
+        Returns {field: value} for a parsed page (a node from html_backends.parse_html)
+        """
+        found = {css: [] for css in self.selectors}
+
+        #elements come back in document order, each goes to every selector it matches
+        untagged = self._by_tag.get("*", [])
+        for node in doc.select_candidates(self._group, self._tags):
+            for css, matcher in self._by_tag.get(node.name, []) + untagged:
+                if matcher(node):
+                    found[css].append(node)
+
+        return {name: rule.extract(found) for name, rule in self.fields.items()}
+
+
+
+
+
+class Rule:
+    """
+    Base of the field rules
+    """
+
+    def __init__(self, selector: str, within: str | None = None, string=None, post=None):
+        self.selector = selector
+        self.within = within
+        self.string = string
+        self.post = post
+
+
+    @property
+    def selectors(self) -> tuple:
+        return (self.selector, self.within) if self.within else (self.selector,)
+
+
+    @property
+    def regions(self) -> tuple | None:
+        """
+        Outermost compounds of the elements the rule reads, keeping every element matching them (with
+        their subtrees) keeps everything the rule can see. A scoped rule only ever looks inside its scope
+        """
+        return (_outermost(self.within or self.selector),)
+
+
+    def extract(self, found: dict):
+        value = self.value(self.candidates(found), found)
+        return self.post(value) if self.post and value is not None else value
+
+
+    def value(self, nodes: list, found: dict):
+        raise NotImplementedError
+
+
+    def candidates(self, found: dict) -> list:
+        """the elements matching the selector that are inside the scope and pass the string predicate"""
+        nodes = found[self.selector]
+
+        if self.string:
+            nodes = [node for node in nodes if node.string is not None and self.string(node.string)]
+
+        if self.within:
+            scope = found[self.within][0] if found[self.within] else None
+            if scope is None:
+                return []
+            nodes = [node for node in nodes if node.is_inside(scope)]
+
+        return nodes
+
+
+
+
+class Text(Rule):
+    """text of the first matching element"""
+
+    def __init__(self, selector: str, separator: str = "", **kwargs):
+        super().__init__(selector, **kwargs)
+        self.separator = separator
+
+    def value(self, nodes, found):
+        return nodes[0].get_text(self.separator, strip=True) if nodes else None
+
+
+
+
+class Texts(Rule):
+    """texts of every matching element as a list, or joined into one string with join, None if nothing matched"""
+
+    def __init__(self, selector: str, separator: str = "", join: str | None = None, **kwargs):
+        super().__init__(selector, **kwargs)
+        self.separator = separator
+        self.join = join
+
+    def value(self, nodes, found):
+        if not nodes:
+            return None
+
+        texts = [node.get_text(self.separator, strip=True) for node in nodes]
+        return self.join.join(texts) if self.join is not None else texts
+
+
+
+
+class Attr(Rule):
+    """an attribute of the first matching element"""
+
+    def __init__(self, selector: str, attr: str, **kwargs):
+        super().__init__(selector, **kwargs)
+        self.attr = attr
+
+    def value(self, nodes, found):
+        return nodes[0][self.attr] if nodes else None
+
+
+
+
+class NextSibling(Rule):
+    """text of the sibling tag following the first matching element, e.g. the paragraph under a heading"""
+
+    def __init__(self, selector: str, sibling: str = "p", separator: str = " ", **kwargs):
+        super().__init__(selector, **kwargs)
+        self.sibling = sibling
+        self.separator = separator
+
+    @property
+    def regions(self) -> tuple | None:
+        #the siblings sit next to the element under its parent, which can be anywhere without a scope
+        return super().regions if self.within else None
+
+    def value(self, nodes, found):
+        sibling = nodes[0].find_next_sibling(self.sibling) if nodes else None
+        return sibling.get_text(self.separator, strip=True) if sibling else None
+
+
+
+
+class SectionText(NextSibling):
+    """
+    Like NextSibling, but when no heading matches, the text of the scope element before its first stop tag
+
+    Used for bios that sometimes sit under their own heading and sometimes just open the page body
+    """
+
+    def __init__(self, selector: str, within: str, stop: str = "h3", **kwargs):
+        super().__init__(selector, within=within, **kwargs)
+        self.stop = stop
+
+    def value(self, nodes, found):
+        if nodes:
+            return super().value(nodes, found)
+
+        scope = found[self.within][0] if found[self.within] else None
+        if scope is None:
+            return None
+
+        parts = []
+        for child in scope.children:
+            if child.name == self.stop:
+                break
+
+            #text between the tags counts too, comments come back empty
+            text = child.get_text(self.separator, strip=True)
+            if text:
+                parts.append(text)
+
+        return self.separator.join(parts) if parts else None
+
+
+
+
+class TextAfterLabels(Rule):
+    """
+    For every matching element whose text is one of labels, the first non empty text among its following
+    siblings (up to the next stop tag), as a list, None if none was found
+    """
+
+    def __init__(self, selector: str, labels, stop: str = "h3", **kwargs):
+        super().__init__(selector, **kwargs)
+        self.labels = set(labels)
+        self.stop = stop
+
+    @property
+    def regions(self) -> tuple | None:
+        return super().regions if self.within else None
+
+    def value(self, nodes, found):
+        texts = []
+
+        for node in nodes:
+            if node.get_text(strip=True) not in self.labels:
+                continue
+
+            for sibling in node.next_siblings:
+                if sibling.name == self.stop:
+                    break
+
+                #a bare string (or comment) between the tags is taken as is
+                if sibling.name is None and sibling.string.strip():
+                    texts.append(sibling.string.strip())
+                    break
+
+                text = sibling.get_text(" ", strip=True)
+                if text:
+                    texts.append(text)
+                    break
+
+        return texts or None
+
+
+
+
+class Concat:
+    """
+    Values of several rules in one list, list values are extended and single values appended, None if empty
+    """
+
+    def __init__(self, *rules):
+        self.rules = rules
+
+    @property
+    def selectors(self) -> tuple:
+        return tuple(css for rule in self.rules for css in rule.selectors)
+
+    @property
+    def regions(self) -> tuple | None:
+        regions = [rule.regions for rule in self.rules]
+        return None if None in regions else tuple(r for rule in regions for r in rule)
+
+    def extract(self, found: dict):
+        values = []
+
+        for rule in self.rules:
+            value = rule.extract(found)
+            if isinstance(value, list):
+                values.extend(value)
+            elif value is not None:
+                values.append(value)
+
+        return values or None
+
+
+
+
+
+def _compile_selector(css: str):
+    """
+    Returns (tag name of the element the selector picks or "*", matcher(node) -> bool)
+
+    Descendant/child chains of tag, class and attribute conditions are matched in python straight off
+    the node, which is far cheaper than a round trip through the selector engine per element. Anything
+    fancier is left to the parser's own matching
+    """
+    compounds = []
+    combinator = None
+
+    for token in _SELECTOR_TOKENS.findall(css.strip()):
+        if token.strip() == ">":
+            combinator = ">"
+        elif not token.strip():
+            combinator = combinator or " "
+        else:
+            compounds.append((combinator, token))
+            combinator = None
+
+    compiled = [(combinator, compile_compound(token)) for combinator, token in compounds]
+
+    if not compiled or any(check is None for _, check in compiled):
+        tag = _COMPOUND.match(compounds[-1][1]).group(1) if compounds else None
+        return tag or "*", lambda node: node.matches(css)
+
+    return compiled[-1][1].tag, lambda node: _matches(compiled, len(compiled) - 1, node)
+
+
+
+def _outermost(css: str) -> str:
+    """first compound of a selector, section.person a[href^='mailto:'] -> section.person"""
+    return _SELECTOR_TOKENS.findall(css.strip())[0]
+
+
+
+def compile_compound(token: str):
+    """
+    A check for one compound like div.field-body[data-x='y'], None when it uses anything unsupported
+
+    The check only reads node.name and node.get(attr), so it works on parsed nodes as well as on a tag
+    that is still being parsed (see RegionFilter in html_backends.py)
+    """
+    match = _COMPOUND.fullmatch(token)
+    if not match:
+        return None
+
+    tag, classes, attributes = match.groups()
+    conditions = list(_ATTRIBUTE.finditer(attributes))
+
+    #some attribute condition didn't parse (a case flag, an operator like |=)
+    if "".join(condition.group(0) for condition in conditions) != attributes:
+        return None
+
+    classes = set(classes.split(".")[1:])
+    conditions = [(name, op, single or double or bare) for name, op, single, double, bare in (c.groups() for c in conditions)]
+
+    return _Compound(tag, classes, conditions)
+
+
+
+class _Compound:
+
+    def __init__(self, tag: str | None, classes: set, conditions: list):
+        self.tag = tag or "*"
+        self.classes = classes
+        self.conditions = conditions
+
+    def __call__(self, node) -> bool:
+        if self.tag != "*" and node.name != self.tag:
+            return False
+
+        if self.classes and not self.classes <= set((node.get("class") or "").split()):
+            return False
+
+        for name, op, expected in self.conditions:
+            value = node.get(name)
+            if value is None:
+                return False
+            if op == "=" and value != expected:
+                return False
+            if op == "^=" and not (expected and value.startswith(expected)):
+                return False
+            if op == "$=" and not (expected and value.endswith(expected)):
+                return False
+            if op == "*=" and not (expected and expected in value):
+                return False
+            if op == "~=" and expected not in value.split():
+                return False
+
+        return True
+
+
+
+def _matches(compiled: list, i: int, node) -> bool:
+    """matches compound i against node, then the compounds before it against its parent or ancestors"""
+    combinator, compound = compiled[i]
+    if not compound(node):
+        return False
+
+    if i == 0:
+        return True
+
+    parent = node.parent
+    if combinator == ">":
+        return parent is not None and _matches(compiled, i - 1, parent)
+
+    while parent is not None:
+        if _matches(compiled, i - 1, parent):
+            return True
+        parent = parent.parent
+
+    return False
+
+
+
+def collapse_whitespace(text: str) -> str:
+    return " ".join(text.split())
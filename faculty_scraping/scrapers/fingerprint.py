@@ -0,0 +1,192 @@
+"""
+Content fingerprints of profile pages
+
+Plenty of servers answer every request with a 200 and no ETag/Last-Modified, so conditional GETs can't tell
+an unchanged page apart. The fingerprint hashes the main content of the page with the bits that change on
+every request taken out (scripts, styles, comments, hidden form fields like CSRF tokens and Drupal form build
+ids, nonces, cache busting query strings on asset urls and full timestamps), so two downloads of a page whose
+content didn't change get the same fingerprint. It works on the raw bytes with a few regexes, no tree is built.
+
+The main content is the department's profile regions (the elements its FIELDS rules read, see extract.py)
+when it has them, so a change to the nav, footer or a news widget doesn't force a re-parse. Departments
+whose rules read the whole page, and pages where no region is found, hash the <body> instead
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+
+from .extract import compile_compound
+
+#only the opening tag is matched, the closing one is looked up with rfind. A single <body ...>(.*)</body>
+#pattern backtracks quadratically on pages that have no </body> (it's optional, and truncated responses lack it)
+_BODY_START = re.compile(rb"<body\b[^>]*>", re.I)
+
+#removed outright. The tags share one pattern since every branch starts at a "<", which the regex engine
+#skips ahead to cheaply, the attributes, timestamps and cache busters below get their own patterns since a
+#single alternation of them all was several times slower
+_VOLATILE_TAGS = re.compile(
+    rb"<(?:script\b.*?</script\s*>|style\b.*?</style\s*>|!--.*?-->|input\b[^>]*\btype\s*=\s*[\"']?hidden\b[^>]*>)",
+    re.I | re.S,
+)
+_VOLATILE_ATTRIBUTES = re.compile(
+    rb"\s(?:nonce|integrity|data-[\w-]*(?:token|nonce|csrf|timestamp)[\w-]*)\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s>]*)"
+)
+
+#the month, day and time of an ISO timestamp, matching from the dash is much cheaper than from the year
+_TIMESTAMP = re.compile(rb"-\d\d-\d\d[T ]\d\d:\d\d(?::\d\d(?:\.\d+)?)?(?:Z|[+-]\d\d:?\d\d)?")
+
+#asset urls keep their path, ?v=123 / ?itok=abc style cache busters are dropped
+_CACHE_BUSTER = re.compile(rb"(\.(?:css|js|png|jpe?g|gif|svg|webp|ico|woff2?|ttf))\?[^\"'\s>)]*", re.I)
+
+
+
+#a start tag with its name and attributes, and the attributes in it
+_START_TAG = re.compile(rb"<([a-zA-Z][\w-]*)([^>]*)>")
+_ATTRIBUTE = re.compile(rb"""([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?""")
+
+
+
+def content_fingerprint(html: str | bytes, regions: tuple[str, ...] | None = None) -> str:
+    """
+    Returns a short hash of the meaningful content of a page, equal for pages that only differ in volatile bits
+
+    regions are simple selectors like "div.field-body" (a department's _profile_regions()), only the elements
+    matching them are hashed. Without them, or if none is on the page, the <body> is
+    """
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+
+    #everything the profile fields are read from is in the regions, or else in the body, the head is mostly
+    #volatile metadata
+    content = _regions(html, regions) if regions else None
+    if not content:
+        content = _body(html)
+
+    content = _VOLATILE_TAGS.sub(b"", content)
+    content = _VOLATILE_ATTRIBUTES.sub(b"", content)
+    content = _TIMESTAMP.sub(b"", content)
+    content = _CACHE_BUSTER.sub(rb"\1", content)
+
+    #whitespace differences don't count, splitting is cheaper than a regex here
+    return hashlib.blake2b(b" ".join(content.split()), digest_size=16).hexdigest()
+
+
+
+def _body(html: bytes) -> bytes:
+    """Returns what's between <body> and the last </body>, the whole document when either of them is missing"""
+    start = _BODY_START.search(html)
+    if not start:
+        return html
+
+    #the last closing tag, case-insensitively. rfind on the lowered bytes is still a single linear pass
+    end = html.lower().rfind(b"</body")
+    if end < start.end():
+        return html
+
+    return html[start.end():end]
+
+
+
+def _regions(html: bytes, regions: tuple[str, ...]) -> bytes:
+    """
+    Returns the elements matching the regions (with everything inside them) in document order, a region
+    inside one that was already taken is part of it
+    """
+    checks = _compile_regions(regions)
+    if checks is None:
+        return b""
+
+    #start offset -> (tag name, end of the start tag) of every element matching a region. Each check looks
+    #for the rarest thing it needs (a class or attribute value, else its tag) instead of visiting every tag
+    found = {}
+    for tag, parts, check, finder in checks:
+        for hit in finder.finditer(html):
+            start = html.rfind(b"<", 0, hit.start() + 1)
+            match = _START_TAG.match(html, start)
+
+            if start in found or not match or match.end() <= hit.start():
+                continue
+
+            name, attributes = match.group(1).lower(), match.group(2)
+            if (tag is None or tag == name) and all(part in attributes for part in parts) and check(_StartTag(name, attributes)):
+                found[start] = (name, match.end())
+
+    spans = []
+    position = 0
+
+    for start in sorted(found):
+        if start < position:
+            continue
+
+        name, start_tag_end = found[start]
+        position = _element_end(html, name, start_tag_end)
+        spans.append(html[start:position])
+
+    return b"\n".join(spans)
+
+
+
+@lru_cache(maxsize=None)
+def _compile_regions(regions: tuple[str, ...]):
+    """
+    [(tag, bytes the start tag has to contain, check, pattern finding candidates)] of the regions, None if
+    one of them isn't a simple selector
+    """
+    compounds = [compile_compound(region) for region in regions]
+    if None in compounds:
+        return None
+
+    checks = []
+    for compound in compounds:
+        tag = None if compound.tag == "*" else compound.tag.encode()
+        parts = [part.encode() for part in compound.classes]
+        parts += [value.encode() for _, _, value in compound.conditions if value]
+
+        if parts:
+            finder = re.compile(re.escape(max(parts, key=len)))
+        else:
+            finder = re.compile(rb"<" + (re.escape(tag) + rb"\b" if tag else rb"[a-zA-Z]"), re.I)
+
+        checks.append((tag, parts, compound, finder))
+
+    return checks
+
+
+
+@lru_cache(maxsize=None)
+def _tag_pattern(name: bytes):
+    return re.compile(rb"<(/?)" + re.escape(name) + rb"\b[^>]*>", re.I)
+
+
+
+def _element_end(html: bytes, name: bytes, start: int) -> int:
+    """End of the element whose start tag ends at start, counting the nested tags of the same name"""
+    depth = 1
+    for match in _tag_pattern(name).finditer(html, start):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return match.end()
+
+    #never closed, the element runs to the end of the page
+    return len(html)
+
+
+
+class _StartTag:
+    """name and attributes of a start tag in the raw bytes, enough for a compound check"""
+
+    __slots__ = ("name", "_attributes", "_attrs")
+
+    def __init__(self, name: bytes, attributes: bytes):
+        self.name = name.decode("latin-1")
+        self._attributes = attributes
+        self._attrs = None
+
+    def get(self, attr, default=None):
+        if self._attrs is None:
+            self._attrs = {
+                key.decode("latin-1").lower(): (double or single or bare).decode("latin-1")
+                for key, double, single, bare in _ATTRIBUTE.findall(self._attributes)
+            }
+        return self._attrs.get(attr, default)
@@ -0,0 +1,393 @@
+import logging
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from bs4.filter import ElementFilter
+
+from .encoding import as_text
+from .extract import compile_compound
+
+logger = logging.getLogger(__name__)
+
+
+#the C backends are optional, without them pages are parsed with BeautifulSoup's pure python html.parser
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+
+#html.parser and lxml build a BeautifulSoup tree, selectolax builds a lexbor tree behind the same node api
+PARSER_BACKENDS = ("html.parser", "lxml", "selectolax")
+DEFAULT_PARSER_BACKEND = "html.parser"
+
+#BeautifulSoup leaves the text inside these tags out of get_text(), the lexbor nodes do the same
+_STRING_CONTAINERS = {"script", "style", "template", "rt", "rp"}
+
+
+
+def resolve_backend(backend: str | None) -> str:
+    """
+    Returns the backend to actually parse with, falling back to html.parser when the requested one isn't installed
+    """
+    backend = backend or DEFAULT_PARSER_BACKEND
+
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"unknown parser backend {backend!r}, expected one of {PARSER_BACKENDS}")
+
+    if (backend == "lxml" and not LXML_AVAILABLE) or (backend == "selectolax" and not SELECTOLAX_AVAILABLE):
+        logger.warning(f"[parse] {backend} is not installed, parsing with html.parser")
+        return "html.parser"
+
+    return backend
+
+
+
+def parse_html(html: str | bytes, backend: str = DEFAULT_PARSER_BACKEND, regions: tuple[str, ...] | None = None):
+    """
+    Parses a page with the given backend and returns its document node
+
+    Every backend's nodes answer the same subset of the BeautifulSoup api the department parsers use
+    (select, select_one, select_candidates, matches, is_inside, parent, get_text, string, children,
+    next_siblings, find_next_sibling, attribute access), so a parser written against it gives the same
+    result whichever backend built the tree
+
+    With regions (simple selectors like "div.field-body") BeautifulSoup only builds the elements matching
+    them and their subtrees, everything around them is skipped. Lexbor builds its whole tree in C faster
+    than python could decide what to skip, so it ignores regions
+
+    Fetched pages come in as bytes and are decoded here, once, with the encoding resolved at fetch time
+    """
+    html = as_text(html)
+
+    if backend == "selectolax":
+        return LexborNode(LexborHTMLParser(html).root.parent)
+
+    return SoupNode(BeautifulSoup(html, backend, parse_only=RegionFilter(regions) if regions else None))
+
+
+
+def extract_links(html: str | bytes, prefix: str) -> list[str]:
+    """
+    Returns the href of every <a> starting with prefix, in document order
+
+    Streams through the page with the standard library tokenizer without building any tree, which is
+    all a directory page is needed for. hrefs are unescaped the same way BeautifulSoup does it
+    """
+    collector = _LinkCollector(prefix)
+    collector.feed(as_text(html))
+    collector.close()
+
+    return collector.links
+
+
+
+
+
+class RegionFilter(ElementFilter):
+    """
+    Lets BeautifulSoup create only the elements matching one of the region selectors (and everything
+    inside them), tags and text outside every region are dropped as they are parsed
+    """
+
+    def __init__(self, regions: tuple[str, ...]):
+        super().__init__()
+        self.checks = [compile_compound(region) for region in regions]
+
+        if None in self.checks:
+            raise ValueError(f"regions must be simple selectors like div.field-body, got {regions}")
+
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        tag = _ParsingTag(name, attrs)
+        return any(check(tag) for check in self.checks)
+
+
+    def allow_string_creation(self, string) -> bool:
+        #only called for text outside every region
+        return False
+
+
+
+
+
+class _ParsingTag:
+    """name and attributes of a tag that is still being parsed, enough for a compound check"""
+
+    __slots__ = ("name", "attrs")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs or {}
+
+    def get(self, attr, default=None):
+        value = self.attrs.get(attr, default)
+        return " ".join(value) if isinstance(value, list) else value
+
+
+
+
+
+class _LinkCollector(HTMLParser):
+
+    def __init__(self, prefix: str):
+        super().__init__(convert_charrefs=True)
+        self.prefix = prefix
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+
+        #a repeated attribute keeps its last value, like in BeautifulSoup
+        href = dict(attrs).get("href")
+        if href and href.startswith(self.prefix):
+            self.links.append(href)
+
+
+
+
+
+class SoupNode:
+    """
+    A BeautifulSoup element (tag or string) behind the shared node api
+    """
+
+    __slots__ = ("_el",)
+
+    def __init__(self, el):
+        self._el = el
+
+
+    @property
+    def name(self) -> str | None:
+        """tag name, None for text and comments"""
+        return self._el.name
+
+
+    @property
+    def string(self) -> str | None:
+        """the text of a string node, or the single string inside a tag (None if it has several children)"""
+        string = self._el.string
+        return None if string is None else str(string)
+
+
+    def select(self, css: str) -> list["SoupNode"]:
+        return [SoupNode(el) for el in self._el.select(css)]
+
+
+    def select_one(self, css: str) -> "SoupNode | None":
+        el = self._el.select_one(css)
+        return SoupNode(el) if el is not None else None
+
+
+    def select_candidates(self, group: str, tags: list[str] | None) -> list["SoupNode"]:
+        """
+        Descendants that may match the selector group, in document order. Comparing tag names in one
+        find_all() walk is much cheaper than running soupsieve over every element, the caller checks the rest
+        """
+        if tags:
+            return [SoupNode(el) for el in self._el.find_all(tags)]
+        return self.select(group)
+
+
+    @property
+    def parent(self) -> "SoupNode | None":
+        return SoupNode(self._el.parent) if self._el.parent is not None else None
+
+
+    def matches(self, css: str) -> bool:
+        return self._el.css.match(css)
+
+
+    def is_inside(self, other: "SoupNode") -> bool:
+        return any(parent is other._el for parent in self._el.parents)
+
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        return self._el.get_text(separator, strip=strip)
+
+
+    def get(self, attr: str, default=None):
+        value = self._el.get(attr, default) if self.name else default
+
+        #multi valued attributes (class, rel) come back as lists from BeautifulSoup
+        return " ".join(value) if isinstance(value, list) else value
+
+
+    def __getitem__(self, attr: str) -> str:
+        value = self.get(attr)
+        if value is None:
+            raise KeyError(attr)
+        return value
+
+
+    @property
+    def children(self):
+        for child in self._el.children:
+            yield SoupNode(child)
+
+
+    @property
+    def next_siblings(self):
+        for sibling in self._el.next_siblings:
+            yield SoupNode(sibling)
+
+
+    def find_next_sibling(self, name: str) -> "SoupNode | None":
+        el = self._el.find_next_sibling(name)
+        return SoupNode(el) if el is not None else None
+
+
+
+
+
+class LexborNode:
+    """
+    A selectolax (lexbor) node behind the shared node api
+    """
+
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+
+    @property
+    def name(self) -> str | None:
+        """tag name, None for text and comments"""
+        return None if self._node.tag.startswith("-") else self._node.tag
+
+
+    @property
+    def string(self) -> str | None:
+        """the text of a string node, or the single string inside a tag (None if it has several children)"""
+        node = self._node
+
+        while True:
+            if node.is_text_node:
+                return node.text_content
+            if node.is_comment_node:
+                return node.comment_content
+
+            children = list(node.iter(include_text=True, skip_empty=False))
+            if len(children) != 1:
+                return None
+            node = children[0]
+
+
+    def select(self, css: str) -> list["LexborNode"]:
+        #lexbor also matches the node itself, BeautifulSoup only looks at its descendants
+        own_id = self._node.mem_id
+        return [LexborNode(node) for node in self._node.css(css) if node.mem_id != own_id]
+
+
+    def select_one(self, css: str) -> "LexborNode | None":
+        matches = self.select(css)
+        return matches[0] if matches else None
+
+
+    def select_candidates(self, group: str, tags: list[str] | None) -> list["LexborNode"]:
+        """descendants matching the selector group in document order, lexbor runs the whole group natively"""
+        return self.select(group)
+
+
+    @property
+    def parent(self) -> "LexborNode | None":
+        return LexborNode(self._node.parent) if self._node.parent is not None else None
+
+
+    def matches(self, css: str) -> bool:
+        #lexbor's css_matches is true when anything in the subtree matches, so the node is looked up
+        #among the matches under its parent instead
+        scope = self._node.parent or self._node
+        own_id = self._node.mem_id
+        return any(node.mem_id == own_id for node in scope.css(css))
+
+
+    def is_inside(self, other: "LexborNode") -> bool:
+        target = other._node.mem_id
+        parent = self._node.parent
+
+        while parent is not None:
+            if parent.mem_id == target:
+                return True
+            parent = parent.parent
+
+        return False
+
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        if not self.name:
+            #comments have no text in BeautifulSoup's get_text
+            text = self._node.text_content if self._node.is_text_node else ""
+            return text.strip() if strip else text
+
+        parts = list(_text_parts(self._node))
+
+        if strip:
+            parts = [stripped for stripped in (part.strip() for part in parts) if stripped]
+
+        return separator.join(parts)
+
+
+    def get(self, attr: str, default=None):
+        if not self.name:
+            return default
+
+        value = self._node.attributes.get(attr, default)
+
+        #valueless attributes (<input disabled>) are empty strings in BeautifulSoup
+        return "" if value is None and attr in self._node.attributes else value
+
+
+    def __getitem__(self, attr: str) -> str:
+        value = self.get(attr)
+        if value is None:
+            raise KeyError(attr)
+        return value
+
+
+    @property
+    def children(self):
+        for child in self._node.iter(include_text=True, skip_empty=False):
+            yield LexborNode(child)
+
+
+    @property
+    def next_siblings(self):
+        sibling = self._node.next
+        while sibling is not None:
+            yield LexborNode(sibling)
+            sibling = sibling.next
+
+
+    def find_next_sibling(self, name: str) -> "LexborNode | None":
+        return next((sibling for sibling in self.next_siblings if sibling.name == name), None)
+
+
+
+
+
+def _text_parts(node):
+    """
+    Yields the text nodes under node in document order, leaving out comments and script/style contents
+    """
+    stack = [iter(node.iter(include_text=True, skip_empty=False))]
+
+    while stack:
+        child = next(stack[-1], None)
+
+        if child is None:
+            stack.pop()
+        elif child.is_text_node:
+            yield child.text_content
+        elif child.is_element_node and child.tag not in _STRING_CONTAINERS:
+            stack.append(iter(child.iter(include_text=True, skip_empty=False)))
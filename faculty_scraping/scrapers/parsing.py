@@ -0,0 +1,45 @@
+import logging
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+
+def make_parse_executor(workers: int | None) -> Executor | None:
+    """
+    Creates the pool profile pages are parsed in, so parsing doesn't block the fetches on the event loop
+
+    BeautifulSoup parsing is CPU bound, so with the GIL it needs separate processes to use more than
+    one core. On a free-threaded build (no GIL) threads run in parallel too and skip the cost of
+    sending the html to another process, so a thread pool is used there. workers=None uses every core,
+    0 returns None which means parsing inline on the event loop like before.
+    """
+    if workers == 0:
+        return None
+
+    workers = workers or os.cpu_count() or 1
+
+    #sys._is_gil_enabled only exists from 3.13 on, older builds always have the GIL
+    if not getattr(sys, "_is_gil_enabled", lambda: True)():
+        logger.info(f"[parse] free-threaded build, parsing in {workers} threads")
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse")
+
+    logger.info(f"[parse] parsing in {workers} processes")
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+
+def parse_in_worker(scraper_cls, html: str, url: str, parser_backend: str) -> dict:
+    """
+    Runs a department's parse_faculty_page inside a pool worker
+
+    Module level so it pickles by reference. Only the scraper class, the html, the url and the parser
+    backend cross the process boundary, parse_faculty_page doesn't use any other instance state so the
+    worker makes a bare instance without running __init__ (which would set up HTTP and browser state
+    for nothing)
+    """
+    scraper = scraper_cls.__new__(scraper_cls)
+    scraper.parser_backend = parser_backend
+    return scraper.parse_faculty_page(html, url)
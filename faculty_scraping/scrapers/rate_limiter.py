@@ -0,0 +1,302 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+logger = logging.getLogger(__name__)
+
+
+#status codes that mean the host wants us to slow down, their Retry-After is honored
+BACKOFF_STATUSES = {429, 503}
+
+#share of the gap to the current latency the best latency closes on every healthy response
+BASELINE_DECAY = 0.1
+
+
+
+class HostLimiter:
+    """
+    Adaptive (AIMD) concurrency limiter keyed by host
+
+    Every host starts at a small concurrency limit. Each healthy response raises the limit by 1/limit,
+    so roughly one extra slot per round of requests (additive increase), as long as the latency stays
+    close to the best latency seen recently for that host. A 429/5xx, timeout or Cloudflare challenge
+    halves the limit (multiplicative decrease), at most once per latency window so a single burst of
+    failures doesn't collapse it to the floor.
+
+    On top of the concurrency limit the limiter also spaces requests out by the robots.txt Crawl-delay
+    and pauses a host completely until its Retry-After has passed.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_tolerance: float = 2.0,
+        backoff_factor: float = 0.5,
+    ):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+
+        #a response slower than latency_tolerance x the recent best latency stops the limit from growing
+        self.latency_tolerance = latency_tolerance
+        self.backoff_factor = backoff_factor
+
+        self._hosts: dict[str, _HostState] = {}
+
+        #robots.txt is only read once per host, a lock per host stops concurrent first requests from all fetching
+        #it without the first request of one host waiting on another host's robots.txt
+        self._robots_checked: set[str] = set()
+        self._robots_locks: dict[str, asyncio.Lock] = {}
+
+
+
+    def slot(self, url: str) -> "_Slot":
+        """
+        Returns an async context manager that holds one concurrency slot for the host of url
+        """
+        return _Slot(self, host_of(url))
+
+
+
+    async def ensure_robots(self, url: str, fetch_robots) -> None:
+        """
+        Applies the robots.txt Crawl-delay of a host the first time it is seen
+
+        fetch_robots is an async callable taking the robots.txt url and returning its text, or None if
+        there is no usable robots.txt
+        """
+        host = host_of(url)
+        if host in self._robots_checked:
+            return
+
+        async with self._robots_locks.setdefault(host, asyncio.Lock()):
+            if host in self._robots_checked:
+                return
+
+            parts = urlsplit(url)
+            robots_url = f"{parts.scheme}://{parts.netloc}/robots.txt"
+
+            try:
+                text = await fetch_robots(robots_url)
+            except Exception as e:
+                logger.info(f"[limiter] could not read {robots_url} ({e})")
+                text = None
+
+            if text:
+                parser = RobotFileParser()
+                parser.parse(text.splitlines())
+                delay = parser.crawl_delay("*")
+                if delay:
+                    self.set_crawl_delay(host, float(delay))
+
+            self._robots_checked.add(host)
+
+
+
+    def set_crawl_delay(self, host: str, delay: float) -> None:
+        """Spaces out request starts to the host by at least delay seconds"""
+        self._state(host).crawl_delay = delay
+        logger.info(f"[limiter] {host} crawl_delay={delay}s")
+
+
+
+    ###------------------------------------------------------------------------------------------------###
+
+    ### internal bookkeeping
+
+    ###------------------------------------------------------------------------------------------------###
+
+
+
+    def _state(self, host: str) -> "_HostState":
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(self.initial)
+        return self._hosts[host]
+
+
+
+    async def _acquire(self, host: str) -> float:
+        """
+        Waits until the host has a free slot and is not paused, returns the start time of the request
+        """
+        loop = asyncio.get_running_loop()
+        state = self._state(host)
+
+        async with state.cond:
+            while True:
+                if state.in_flight < int(state.limit):
+                    now = loop.time()
+                    wait = max(state.paused_until, state.next_start) - now
+
+                    if wait <= 0:
+                        state.in_flight += 1
+                        state.next_start = now + state.crawl_delay
+                        return now
+
+                    #a slot is free but the host is paused or inside its crawl delay
+                    try:
+                        await asyncio.wait_for(state.cond.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await state.cond.wait()
+
+
+
+    async def _release(self, host: str, started: float, healthy: bool | None, retry_after: float | None) -> None:
+        """
+        Frees a slot and adjusts the limit of the host from the outcome of the request,
+        healthy=None frees it without adjusting anything
+        """
+        loop = asyncio.get_running_loop()
+        state = self._state(host)
+        now = loop.time()
+        latency = now - started
+
+        async with state.cond:
+            state.in_flight -= 1
+
+            if healthy:
+                state.observe(latency)
+
+                #additive increase, only while the host isn't slowing down under the extra load
+                if state.latency <= state.best_latency * self.latency_tolerance:
+                    state.limit = min(self.max_limit, state.limit + 1 / state.limit)
+
+            elif healthy is False:
+                #multiplicative decrease, once per latency window
+                window = max(state.latency or 1.0, 1.0)
+                if now - state.last_decrease >= window:
+                    state.limit = max(self.min_limit, state.limit * self.backoff_factor)
+                    state.last_decrease = now
+                    logger.info(f"[limiter] backing off {host} | limit={int(state.limit)}")
+
+            if retry_after:
+                state.paused_until = max(state.paused_until, now + retry_after)
+                logger.info(f"[limiter] pausing {host} for {retry_after:.1f}s (Retry-After)")
+
+            state.cond.notify_all()
+
+
+
+
+
+class _HostState:
+    """Mutable limiter state of a single host"""
+
+    def __init__(self, limit: int):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.crawl_delay = 0.0
+        self.next_start = 0.0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+
+        #exponentially weighted latency and the best value it reached recently, the baseline creeps up towards
+        #the current latency so one unusually fast response (a 304, a 404, a tiny page) doesn't stop the limit
+        #from growing for the rest of the run
+        self.latency = None
+        self.best_latency = None
+
+        self.cond = asyncio.Condition()
+
+
+    def observe(self, latency: float) -> None:
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if self.best_latency is None or self.latency < self.best_latency:
+            self.best_latency = self.latency
+        else:
+            self.best_latency += BASELINE_DECAY * (self.latency - self.best_latency)
+
+
+
+
+
+class _Slot:
+    """
+    One held concurrency slot, the request outcome is reported through it before it is released
+
+    If nothing is reported the slot counts as healthy when the block exits normally, and as a
+    congestion signal (timeout, reset connection, ...) when it exits with an exception
+    """
+
+    def __init__(self, limiter: HostLimiter, host: str):
+        self.limiter = limiter
+        self.host = host
+        self.started = 0.0
+        self.healthy = None
+        self.retry_after = None
+        self.skipped = False
+
+
+    def record_response(self, status_code: int, headers) -> None:
+        """Reports an HTTP response, 429 and 5xx back off, 429/503 also honor Retry-After"""
+        self.healthy = status_code not in BACKOFF_STATUSES and status_code < 500
+
+        if status_code in BACKOFF_STATUSES:
+            self.retry_after = parse_retry_after(headers.get("Retry-After"))
+
+
+    def backoff(self) -> None:
+        """Reports a block that didn't come with a status code, like a Cloudflare challenge page"""
+        self.healthy = False
+
+
+    def reset_clock(self) -> None:
+        """Restarts the latency measurement, for time spent waiting on something other than the host"""
+        self.started = asyncio.get_running_loop().time()
+
+
+    def skip(self) -> None:
+        """Reports that no request was made with the slot, the limit is left as it is"""
+        self.skipped = True
+
+
+    async def __aenter__(self):
+        self.started = await self.limiter._acquire(self.host)
+        return self
+
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.skipped:
+            healthy = None
+        else:
+            healthy = self.healthy if self.healthy is not None else exc_type is None
+        await self.limiter._release(self.host, self.started, healthy, self.retry_after)
+        return False
+
+
+
+
+
+def host_of(url: str) -> str:
+    """Returns the lowercase host of a url, the key the limiter tracks"""
+    return (urlsplit(url).hostname or "").lower()
+
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parses a Retry-After header which is either a number of seconds or an HTTP date
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
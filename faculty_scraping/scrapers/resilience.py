@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import random
+import time
+
+from .rate_limiter import host_of
+
+logger = logging.getLogger(__name__)
+
+
+#status codes worth retrying, the host is overloaded or a proxy in front of it hiccuped
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+
+
+class BotChallengeError(RuntimeError):
+    """The host answered with a bot protection challenge, only a real browser gets past it"""
+
+
+
+class ForbiddenError(BotChallengeError):
+    """
+    A bare 403 without any challenge markers, it may be bot protection or just a page that is forbidden,
+    so only that page is retried in the browser and the host keeps its route
+    """
+
+
+
+class HostUnavailableError(RuntimeError):
+    """The circuit breaker of the host is open, the request is failed without touching the network"""
+
+
+
+class TransientHTTPError(RuntimeError):
+    """A retryable error status (429/5xx)"""
+
+    def __init__(self, status_code: int, url: str):
+        super().__init__(f"HTTP {status_code} for {url}")
+        self.status_code = status_code
+
+
+
+
+
+class RetryPolicy:
+    """
+    How many times a transient failure is retried and how long to wait in between
+
+    Delays use exponential backoff with full jitter, attempt n sleeps a random time between 0 and
+    min(max_delay, base_delay * 2**n), which spreads the retries of many concurrent fetches apart
+    instead of having them all hit the host again at the same moment
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 20.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+
+    def delay(self, attempt: int) -> float:
+        """Returns the sleep before retry number attempt (starting at 0)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+
+
+
+class CircuitBreaker:
+    """
+    Per host circuit breaker
+
+    After failure_threshold consecutive failures (timeouts, refused connections, 5xx) the host is
+    considered down and the breaker opens, requests to it wait in before_request() instead of hitting
+    it for reset_timeout seconds. After that a single probe request is let through (half open), the
+    others wait for its outcome. If it succeeds the breaker closes and they all go ahead, if it fails
+    the breaker opens for another reset_timeout. After max_failed_probes failed probes in a row the host
+    is given up on for the rest of the run and its requests fail fast with HostUnavailableError
+    """
+
+    def __init__(self, failure_threshold: int = 10, reset_timeout: float = 60.0, max_failed_probes: int = 5):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_failed_probes = max_failed_probes
+
+        self._failures: dict[str, int] = {}
+        self._failed_probes: dict[str, int] = {}
+        self._opened_at: dict[str, float] = {}
+        self._probing: set[str] = set()
+        self._given_up: set[str] = set()
+
+        #host -> event set on the next change of the host's state, for the requests waiting on it
+        self._changed: dict[str, asyncio.Event] = {}
+
+
+
+    async def before_request(self, url: str) -> bool:
+        """
+        Waits while the host's breaker is open, returns True when the request is let through as the half
+        open probe, which has to be ended with end_probe() once it is over
+
+        Raises HostUnavailableError once the host is given up on
+        """
+        host = host_of(url)
+
+        while host in self._opened_at:
+            if host in self._given_up:
+                raise HostUnavailableError(f"circuit open for {host}, given up after {self.max_failed_probes} failed probes")
+
+            remaining = self._opened_at[host] + self.reset_timeout - time.monotonic()
+
+            #cooldown is over, let this request through as the probe
+            if remaining <= 0 and host not in self._probing:
+                self._probing.add(host)
+                logger.info(f"[breaker] probing {host}")
+                return True
+
+            #waits out the cooldown, or for the outcome of the probe in flight
+            event = self._changed.setdefault(host, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), remaining if remaining > 0 else None)
+            except asyncio.TimeoutError:
+                pass
+
+        return False
+
+
+
+    def record_success(self, url: str) -> None:
+        host = host_of(url)
+        self._failures[host] = 0
+        self._failed_probes[host] = 0
+
+        if host in self._opened_at:
+            logger.info(f"[breaker] closing circuit for {host}")
+            self._opened_at.pop(host)
+            self._probing.discard(host)
+            self._notify(host)
+
+
+
+    def record_failure(self, url: str, probe: bool = False) -> None:
+        """A failed request to the host, probe tells whether it was the half open probe"""
+        host = host_of(url)
+        self._failures[host] = self._failures.get(host, 0) + 1
+
+        if probe:
+            self._probing.discard(host)
+            self._failed_probes[host] = self._failed_probes.get(host, 0) + 1
+
+            if self._failed_probes[host] >= self.max_failed_probes:
+                self._given_up.add(host)
+                logger.error(f"[breaker] giving up on {host} after {self._failed_probes[host]} failed probes")
+
+        #a failed probe or too many failures in a row (re)opens the circuit
+        elif host in self._opened_at or self._failures[host] < self.failure_threshold:
+            return
+
+        self._opened_at[host] = time.monotonic()
+        logger.warning(
+            f"[breaker] opening circuit for {host} | "
+            f"failures={self._failures[host]} cooldown={self.reset_timeout}s"
+        )
+        self._notify(host)
+
+
+    def end_probe(self, url: str) -> None:
+        """
+        Frees the probe slot of a probe that ended without a success or failure being recorded (cancelled,
+        handed to the browser, ...), so the next request probes instead of the host staying shut for the run
+        """
+        host = host_of(url)
+        if host in self._probing:
+            self._probing.discard(host)
+            self._notify(host)
+
+
+
+    def _notify(self, host: str) -> None:
+        """Wakes the requests waiting on the host, they check its state again"""
+        event = self._changed.pop(host, None)
+        if event:
+            event.set()
+
+
+
+    def is_open(self, url: str) -> bool:
+        return host_of(url) in self._opened_at
@@ -0,0 +1,159 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from .rate_limiter import host_of
+
+logger = logging.getLogger(__name__)
+
+
+
+class RoutedToBrowser(Exception):
+    """Raised by an HTTP fetch that was queued before its host got routed to the browser"""
+
+
+
+class FetchRouter:
+    """
+    Remembers per host whether plain HTTP works or the host needs the browser
+
+    Once a host answers with a bot challenge every later request to it goes straight to Playwright
+    instead of paying for a doomed HTTP round trip first. The routes are loaded from and saved to
+    DuckDB by run.py so the knowledge carries over between runs.
+
+    A browser routed host is re-probed over HTTP every probe_every requests, and on the first request
+    of a run once its route is older than probe_after, in case the protection was lifted. Only one
+    probe per host is in flight at a time.
+
+    When the browser passes a Cloudflare challenge its clearance (the expiry, the cookies and the user agent
+    they were issued to, kept together) is recorded here, and the host is served over HTTP by every
+    department's client until the clearance expires or gets challenged again, without changing its stored route.
+    """
+
+    def __init__(
+        self,
+        routes: dict[str, dict] | None = None,
+        probe_every: int = 100,
+        probe_after: timedelta = timedelta(days=1),
+    ):
+        #host -> {"method": "http" | "browser", "updated_at": timezone aware datetime}
+        self.routes = routes if routes is not None else {}
+        self.probe_every = probe_every
+        self.probe_after = probe_after
+
+        self._browser_requests: dict[str, int] = {}
+        self._probing: set[str] = set()
+
+        #hosts whose route changed this run and still has to be written back to DuckDB
+        self._changed: set[str] = set()
+
+        #host -> {"expires": unix time, "cookies": browser cookies of the host, "user_agent": str}, shared by
+        #every department since one run scoped router decides for all of them that the host goes over HTTP
+        self._clearances: dict[str, dict] = {}
+
+
+
+    def method_for(self, url: str) -> str:
+        """
+        Returns "http", "browser", or "probe" (try HTTP on a host that is routed to the browser)
+        """
+        host = host_of(url)
+        route = self.routes.get(host)
+
+        if not route or route["method"] != "browser" or self.has_clearance(url):
+            return "http"
+
+        if host in self._probing:
+            return "browser"
+
+        count = self._browser_requests.get(host, 0)
+        self._browser_requests[host] = count + 1
+
+        stale = route["updated_at"] is None or _now() - route["updated_at"] >= self.probe_after
+        if stale or (count and count % self.probe_every == 0):
+            self._probing.add(host)
+            logger.info(f"[router] probing HTTP for {host}")
+            return "probe"
+
+        return "browser"
+
+
+
+    def prefers_browser(self, url: str) -> bool:
+        """True when the host of url is known to need the browser"""
+        route = self.routes.get(host_of(url))
+        return bool(route) and route["method"] == "browser" and not self.has_clearance(url)
+
+
+
+    def has_clearance(self, url: str) -> bool:
+        """True while there is an unexpired clearance for the host of url"""
+        return self.clearance(url) is not None
+
+
+
+    def clearance(self, url: str) -> dict | None:
+        """Returns the unexpired clearance of the host of url, which HTTP requests to it have to carry"""
+        clearance = self._clearances.get(host_of(url))
+        return clearance if clearance and clearance["expires"] > time.time() else None
+
+
+
+    def record_clearance(self, url: str, expires: float, cookies: list[dict], user_agent: str) -> None:
+        """The browser passed the challenge, its cookies and user agent let HTTP clients through until expires"""
+        host = host_of(url)
+        if not self.has_clearance(url):
+            logger.info(f"[router] serving {host} over HTTP with browser clearance until {time.ctime(expires)}")
+        self._clearances[host] = {"expires": expires, "cookies": cookies, "user_agent": user_agent}
+
+
+
+    def record_block(self, url: str) -> None:
+        """The host served a bot challenge over HTTP, route it to the browser"""
+        host = host_of(url)
+
+        #a challenge despite the clearance means it expired or was revoked, the browser earns a new one
+        self._clearances.pop(host, None)
+        self._set(host, "browser")
+
+
+
+    def record_http_ok(self, url: str) -> None:
+        """A plain HTTP request went through, route the host back to HTTP if it was on the browser"""
+        host = host_of(url)
+        route = self.routes.get(host)
+
+        #with a clearance HTTP only works thanks to the browser, so the stored route stays as it is
+        if route and route["method"] == "browser" and not self.has_clearance(url):
+            self._set(host, "http")
+
+
+
+    def end_probe(self, url: str) -> None:
+        self._probing.discard(host_of(url))
+
+
+
+    def pop_changes(self) -> dict[str, dict]:
+        """Returns the routes that changed since the last call, for persisting"""
+        changes = {host: self.routes[host] for host in self._changed}
+        self._changed.clear()
+        return changes
+
+
+
+    def _set(self, host: str, method: str) -> None:
+        previous = self.routes.get(host, {}).get("method")
+        self.routes[host] = {"method": method, "updated_at": _now()}
+        self._changed.add(host)
+
+        if previous != method:
+            logger.info(f"[router] routing {host} over {method}")
+
+
+
+
+
+def _now() -> datetime:
+    return datetime.now(ZoneInfo("America/New_York"))
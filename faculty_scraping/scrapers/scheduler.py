@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+
+
+class FairBudget:
+    """
+    Global concurrency budget shared by several departments with weighted fair sharing
+
+    At most capacity slots are held at once across all departments. While there is spare capacity
+    anyone gets a slot right away, once it is contended each freed slot goes to the waiting department
+    holding the fewest slots relative to its weight, so a department with weight 2 ends up with about
+    twice the share of a department with weight 1 and no department can starve the others.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._in_use = 0
+        self._weights: dict[str, float] = {}
+        self._held: dict[str, int] = defaultdict(int)
+        self._waiters: dict[str, deque] = defaultdict(deque)
+
+
+
+    def register(self, key: str, weight: float = 1.0) -> None:
+        """Sets the share weight of a department, unregistered departments weigh 1"""
+        self._weights[key] = weight
+
+
+
+    def slot(self, key: str) -> "_BudgetSlot":
+        """Returns an async context manager holding one slot of the budget for key"""
+        return _BudgetSlot(self, key)
+
+
+
+    async def acquire(self, key: str) -> None:
+        if self._in_use < self.capacity and not any(self._waiters.values()):
+            self._grant(key)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[key].append(future)
+
+        try:
+            await future
+
+        except asyncio.CancelledError:
+            if future.cancelled():
+                #gave up while still queued
+                try:
+                    self._waiters[key].remove(future)
+                except ValueError:
+                    pass
+            else:
+                #the slot was granted just as the waiter got cancelled, hand it on
+                self.release(key)
+            raise
+
+
+
+    def release(self, key: str) -> None:
+        self._in_use -= 1
+        self._held[key] -= 1
+        self._wake()
+
+
+
+    def _grant(self, key: str) -> None:
+        self._in_use += 1
+        self._held[key] += 1
+
+
+
+    def _wake(self) -> None:
+        """Hands free slots to the waiting departments furthest below their fair share"""
+        while self._in_use < self.capacity:
+            waiting = [key for key, queue in self._waiters.items() if queue]
+            if not waiting:
+                return
+
+            key = min(waiting, key=lambda k: self._held[k] / self._weights.get(k, 1.0))
+            future = self._waiters[key].popleft()
+
+            #cancelled waiters are just dropped
+            if future.done():
+                continue
+
+            self._grant(key)
+            future.set_result(None)
+
+
+
+
+
+class _BudgetSlot:
+
+    def __init__(self, budget: FairBudget, key: str):
+        self.budget = budget
+        self.key = key
+
+    async def __aenter__(self):
+        await self.budget.acquire(self.key)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.budget.release(self.key)
+        return False
+
+
+
+
+
+class RunScheduler:
+    """
+    Drives all selected departments concurrently under one global HTTP and browser budget
+
+    Every scraper borrows its HTTP requests and browser pages from the shared FairBudgets (on top of
+    the per host limiters), weighted by the scraper's SCHEDULE_WEIGHT. Each department's results are
+    handed to on_batch in micro batches while it is still scraping, and on_finished is called as soon
+    as that department is done, so its metrics are recorded without waiting for the slower
+    departments. A department that fails is logged and doesn't stop the others.
+    """
+
+    def __init__(self, http_budget: int = 48, browser_budget: int = 4):
+        self.http_budget = FairBudget(http_budget)
+        self.browser_budget = FairBudget(browser_budget)
+
+
+
+    async def run(self, scrapers, on_batch, on_finished) -> list:
+        """
+        Scrapes every department concurrently
+
+        on_batch is an async callable taking (scraper, raw_pages, records), on_finished an async callable
+        taking the scraper. Returns the scrapers whose department finished without an error
+        """
+        for scraper in scrapers:
+            self.http_budget.register(scraper.department, scraper.SCHEDULE_WEIGHT)
+            self.browser_budget.register(scraper.department, scraper.SCHEDULE_WEIGHT)
+
+        finished = await asyncio.gather(*(self._run_one(scraper, on_batch, on_finished) for scraper in scrapers))
+
+        return [scraper for scraper, ok in zip(scrapers, finished) if ok]
+
+
+
+    async def _run_one(self, scraper, on_batch, on_finished) -> bool:
+        async def sink(raw_pages, records):
+            await on_batch(scraper, raw_pages, records)
+
+        try:
+            await scraper.scrape(sink=sink)
+            await on_finished(scraper)
+            return True
+
+        except Exception:
+            logger.exception(f"[{scraper.department}] department failed, continuing with the others")
+            return False
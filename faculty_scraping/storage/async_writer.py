@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import queue
+import threading
+
+from storage.duckdb_writer import DuckDBWriter
+
+
+logger = logging.getLogger(__name__)
+
+
+#writes whose submissions in one transaction are merged into one call, they take a list and insert every item of it
+MERGEABLE = {"insert_raw_pages", "insert_records"}
+
+#tells the writer thread to commit what it has and close the connection
+_STOP = object()
+
+
+
+class AsyncDuckDBWriter:
+    """
+    Async front of DuckDBWriter that owns the DuckDB connection on a background thread
+
+    Every DuckDBWriter call made through it runs on the writer thread in the order it was made, so the
+    event loop never waits on the database and the fetches in flight keep going while a batch is stored.
+    Whatever has piled up on the queue by the time the thread gets to it is written in one transaction,
+    with the batches of raw pages / records in it merged into a single insert each
+
+    submit() is fire and forget, it only waits when max_pending writes are already queued so a slow disk
+    slows the scrape down instead of growing the queue without limit. call() waits for the result (for
+    the loads). flush() waits until everything submitted so far is committed and raises the first write
+    error since the last flush
+    """
+
+    def __init__(self, db_path: str = "faculty.duckdb", max_pending: int = 16, max_coalesce: int = 64):
+        self.db_path = db_path
+        self.max_coalesce = max_coalesce
+
+        self._queue = queue.SimpleQueue()
+        self._pending = asyncio.Semaphore(max_pending)
+        self._thread = None
+        self._loop = None
+
+        #first error of a submitted write, raised by the next flush()
+        self._error = None
+
+
+
+    async def start(self) -> None:
+        """Starts the writer thread and connects to the database on it"""
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._run, name="duckdb-writer", daemon=True)
+        self._thread.start()
+
+        await self._call(lambda db: None)
+
+
+
+    async def call(self, method: str, *args):
+        """Runs a DuckDBWriter method on the writer thread after everything submitted before it and returns its result"""
+        return await self._call(lambda db: getattr(db, method)(*args))
+
+
+
+    async def submit(self, method: str, *args) -> None:
+        """Queues a DuckDBWriter write without waiting for it, errors come back from flush()"""
+        await self._pending.acquire()
+        self._queue.put((method, args, None))
+
+
+
+    async def flush(self) -> None:
+        """Waits until every write submitted so far is committed"""
+        await self._call(lambda db: None)
+
+        error, self._error = self._error, None
+        if error:
+            raise error
+
+
+
+    async def close(self) -> None:
+        """Commits the remaining writes, closes the connection and stops the thread"""
+        if self._thread is None:
+            return
+
+        try:
+            await self.flush()
+
+        finally:
+            self._queue.put(_STOP)
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+
+
+    async def _call(self, fn):
+        future = self._loop.create_future()
+        self._queue.put((fn, (), future))
+        return await future
+
+
+
+    ###------------------------------------------------------------------------------------------------###
+
+    ### writer thread
+
+    ###------------------------------------------------------------------------------------------------###
+
+
+
+    def _run(self) -> None:
+        db = None
+
+        try:
+            db = DuckDBWriter(self.db_path)
+
+        except Exception as e:
+            #every call fails with the connection error until the writer is closed
+            logger.error(f"[writer] could not connect to {self.db_path}: {e}")
+
+        while True:
+            items = [self._queue.get()]
+
+            #takes whatever else is already waiting, up to max_coalesce items per transaction
+            while len(items) < self.max_coalesce and items[-1] is not _STOP:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = items[-1] is _STOP
+            if stop:
+                items.pop()
+
+            if items:
+                self._write(db, items)
+
+            if stop:
+                break
+
+        if db:
+            db.con.close()
+
+
+
+    def _write(self, db, items: list) -> None:
+        """
+        Runs the items in one transaction, if it fails each item is retried in its own transaction so one
+        bad batch doesn't take the others down with it
+        """
+        if db is None:
+            for item in items:
+                self._done(item, error=ConnectionError(f"no DuckDB connection to {self.db_path}"))
+            return
+
+        merged = _coalesce(items)
+
+        try:
+            results = self._transaction(db, merged)
+
+        except Exception as e:
+            logger.warning(f"[writer] transaction of {len(items)} writes failed ({e}), retrying them one by one")
+
+            for item in items:
+                try:
+                    result, = self._transaction(db, [item])
+                    self._done(item, result=result)
+                except Exception as e:
+                    logger.error(f"[writer] {_name(item)} failed: {e}")
+                    self._done(item, error=e)
+            return
+
+        #a merged write is done for every submission it stands for
+        for item, result in zip(merged, results):
+            for _ in range(item[3]):
+                self._done(item, result=result)
+
+
+
+    def _transaction(self, db, items: list) -> list:
+        """Runs the items in one transaction and returns each one's result"""
+        with db.transaction():
+            return [_apply(db, item) for item in items]
+
+
+
+    def _done(self, item, result=None, error=None) -> None:
+        """Hands the outcome of an item back to the event loop"""
+        method, args, future = item[:3]
+
+        if future is not None:
+            self._loop.call_soon_threadsafe(_resolve, future, result, error)
+            return
+
+        self._loop.call_soon_threadsafe(self._pending.release)
+        if error:
+            self._loop.call_soon_threadsafe(self._keep_error, error)
+
+
+
+    def _keep_error(self, error: Exception) -> None:
+        self._error = self._error or error
+
+
+
+
+
+def _coalesce(items: list) -> list:
+    """
+    Merges the submissions of each MERGEABLE write into the first one of them, up to the next item that
+    isn't one (a call or another write), so the order between them and everything else is kept. The
+    merged item remembers how many it stands for as a fourth field
+    """
+    merged = []
+    open_writes = {}
+
+    for method, args, future in items:
+        if future is None and method in MERGEABLE:
+            if method in open_writes:
+                i = open_writes[method]
+                first_method, first_args, _, count = merged[i]
+                merged[i] = (first_method, (first_args[0] + args[0],), None, count + 1)
+                continue
+
+            open_writes[method] = len(merged)
+        else:
+            open_writes = {}
+
+        merged.append((method, args, future, 1))
+
+    return merged
+
+
+
+def _apply(db, item):
+    method, args = item[:2]
+    return method(db) if callable(method) else getattr(db, method)(*args)
+
+
+
+def _name(item) -> str:
+    return item[0] if isinstance(item[0], str) else "call"
+
+
+
+def _resolve(future, result, error) -> None:
+    #the awaiting task may have been cancelled meanwhile
+    if future.done():
+        return
+    if error:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
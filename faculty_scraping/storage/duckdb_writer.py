@@ -1,5 +1,7 @@
 import duckdb
-import json
+import hashlib
+from contextlib import contextmanager
+import pyarrow as pa
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import logging
@@ -8,6 +10,20 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+#the fields of a faculty record a new history version is written for when any of them changes
+RECORD_FIELDS = ("name", "department", "title", "bio", "expertise", "email")
+
+#faculty_expertise rows of the records in a table, one per term
+_EXPLODE_EXPERTISE = """
+    SELECT webpage_link, term, lower(trim(regexp_replace(term, '\\s+', ' ', 'g'))) AS normalized_term
+    FROM (SELECT webpage_link, unnest(expertise) AS term FROM {source})
+    WHERE term IS NOT NULL AND trim(term) <> ''
+"""
+
+#storage format of newly created database files, the oldest one that compresses strings with zstd
+STORAGE_VERSION = "v1.2.0"
+
+
 
 class DuckDBWriter:
     """
@@ -20,9 +36,40 @@ class DuckDBWriter:
             
         """
 
-        self.con = duckdb.connect(db_path)
+        #new database files are written in a storage format recent enough to zstd compress long strings (the raw html),
+        #files created before keep the format they were created with
+        self.con = duckdb.connect(db_path, config={"storage_compatibility_version": STORAGE_VERSION})
         logger.info(f"Connected to DuckDB at {db_path}")
 
+        #set while transaction() holds a transaction open, nested transaction() blocks join it
+        self._in_transaction = False
+
+
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs the block in one transaction, rolled back if it raises. Inside another transaction() block it
+        just joins the outer one, so a method can make its own statements atomic and still be part of a
+        bigger transaction (the async writer runs every batch of calls in one)
+        """
+        if self._in_transaction:
+            yield
+            return
+
+        self.con.begin()
+        self._in_transaction = True
+
+        try:
+            yield
+        except BaseException:
+            self.con.rollback()
+            raise
+        else:
+            self.con.commit()
+        finally:
+            self._in_transaction = False
+
 
     def init_tables(self):
         """
@@ -30,8 +77,19 @@ class DuckDBWriter:
         
         """
         
+        #stores every distinct raw html page once, keyed by the sha256 of its text
+        #a page that didn't change between runs is only stored the first time it was seen
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS raw_html_blobs (
+                content_hash TEXT PRIMARY KEY,
+                html TEXT USING COMPRESSION zstd,
+                first_seen_at TIMESTAMP
+                );
+
+        """)
+
         #table for keeping all the history html snapshots
-        #multiple rows per URL are allowed to keep track of changes 
+        #multiple rows per URL are allowed to keep track of changes, each pointing at its html in raw_html_blobs
         
 
         self.con.execute("""                
@@ -39,13 +97,30 @@ class DuckDBWriter:
                 run_id TEXT,
                 department TEXT,
                 url TEXT,
-                html TEXT,
+                content_hash TEXT,
                 fetch_method TEXT, 
                 scraped_at TIMESTAMP
                 );
 
         """)
 
+        #databases from before the blob table still have the html inline
+        self._migrate_raw_html()
+
+        #the snapshots with their html, what faculty_raw_pages held before the html moved to raw_html_blobs
+        self.con.execute("""
+            CREATE OR REPLACE VIEW faculty_raw_pages_html AS
+            SELECT p.run_id, p.department, p.url, b.html, p.fetch_method, p.scraped_at, p.content_hash
+            FROM faculty_raw_pages p
+            LEFT JOIN raw_html_blobs b USING (content_hash)
+        """)
+
+        if not self._compresses_strings():
+            logger.warning(
+                "database file predates zstd string compression, raw html is deduplicated but not compressed "
+                "(EXPORT DATABASE / IMPORT DATABASE into a new file to compress it)"
+            )
+
 
 
         #stores the latest normalized faculty data records
@@ -57,7 +132,7 @@ class DuckDBWriter:
                 webpage_link TEXT PRIMARY KEY,
                 title TEXT,
                 bio TEXT,
-                expertise TEXT,
+                expertise VARCHAR[],
                 email TEXT,
                 scraped_at TIMESTAMP                               
                 )
@@ -65,6 +140,71 @@ class DuckDBWriter:
         """)
 
 
+        #every version of every faculty record, a new row is only written when some field of the record changed
+        #the current version has valid_to NULL, a point in time t is valid_from <= t AND (valid_to IS NULL OR valid_to > t)
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS faculty_records_history (
+                name TEXT,
+                department TEXT,
+                title TEXT,
+                bio TEXT,
+                expertise VARCHAR[],
+                email TEXT,
+                webpage_link TEXT,
+                valid_from TIMESTAMP,
+                valid_to TIMESTAMP
+                )
+
+        """)
+
+        #databases from before the list column still have expertise as json text
+        self._migrate_expertise()
+
+        self.con.execute("""
+            CREATE INDEX IF NOT EXISTS faculty_records_history_link ON faculty_records_history (webpage_link)
+        """)
+
+        #databases from before the history table start their history with the records they have
+        self.con.execute(f"""
+            INSERT INTO faculty_records_history
+            SELECT {", ".join(RECORD_FIELDS)}, webpage_link, scraped_at, NULL FROM faculty_records
+            WHERE NOT EXISTS (SELECT 1 FROM faculty_records_history)
+        """)
+
+        self.con.execute(f"""
+            CREATE OR REPLACE VIEW faculty_records_current AS
+            SELECT {", ".join(RECORD_FIELDS)}, webpage_link, valid_from FROM faculty_records_history
+            WHERE valid_to IS NULL
+        """)
+
+
+        #one row per expertise term of the current faculty records, rewritten along with the record when it changes
+        #normalized_term is lowercased with collapsed whitespace, for matching terms across departments
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS faculty_expertise (
+                webpage_link TEXT,
+                term TEXT,
+                normalized_term TEXT
+                )
+
+        """)
+
+        self.con.execute("""
+            CREATE INDEX IF NOT EXISTS faculty_expertise_term ON faculty_expertise (normalized_term)
+        """)
+
+        self.con.execute("""
+            CREATE INDEX IF NOT EXISTS faculty_expertise_link ON faculty_expertise (webpage_link)
+        """)
+
+        #databases from before the expertise table fill it from the records they have
+        self.con.execute(f"""
+            INSERT INTO faculty_expertise
+            {_EXPLODE_EXPERTISE.format(source="faculty_records")}
+            AND NOT EXISTS (SELECT 1 FROM faculty_expertise)
+        """)
+
+
         #stores run-time metrics
         #one row per execution
         self.con.execute("""
@@ -98,6 +238,51 @@ class DuckDBWriter:
                          
         """)
 
+        #stores the HTTP cache validators of each profile page from the last successful parse
+        #one row per url, used to send conditional GETs on the next run
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS http_validators (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                updated_at TIMESTAMP
+            );
+
+        """)
+
+        #stores the content fingerprint of each profile page from the last successful parse
+        #one row per url, a page downloaded again with the same fingerprint is not parsed or stored again
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS page_fingerprints (
+                url TEXT PRIMARY KEY,
+                fingerprint TEXT,
+                updated_at TIMESTAMP
+            );
+
+        """)
+
+        #stores which fetch method each host needs, "browser" for hosts that challenge HTTP clients
+        #one row per host, lets the next run skip the doomed HTTP attempts
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS host_fetch_routes (
+                host TEXT PRIMARY KEY,
+                method TEXT,
+                updated_at TIMESTAMP
+            );
+
+        """)
+
+        #stores the profile urls found by the latest directory crawl of each department
+        #one row per department, lets a follow-up run within the TTL skip discovery
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS discovery_cache (
+                department TEXT PRIMARY KEY,
+                urls TEXT[],
+                discovered_at TIMESTAMP
+            );
+
+        """)
+
         logger.info(f"DuckDB tables initialized")
 
 
@@ -105,20 +290,51 @@ class DuckDBWriter:
             """
             Inserts the raw HTML pages of each of the faculty members into the db
 
+            Each snapshot row only references its html by content hash, the html itself goes to raw_html_blobs
+            unless the same content is already stored there. The batch is handed to DuckDB as Arrow tables
+            and loaded with a single INSERT ... SELECT each, instead of a row by row executemany
             """
 
             if not raw_pages:
                  logger.warning("No raw pages to insert")
                  return
 
-            self.con.executemany("""
-            INSERT INTO faculty_raw_pages (run_id, department, url, html, fetch_method, scraped_at)
-            VALUES (?,?,?,?,?,?) """, 
-            
-            
-            [ (p["run_id"], p["department"], p["url"], p["html"],p["fetch_method"], p["scraped_at"]) for p in raw_pages ])
+            #pages fetched over HTTP are kept as bytes until here, they decode with the encoding resolved at fetch time
+            texts = [_html_text(p["html"]) for p in raw_pages]
+            hashes = [content_hash(text) for text in texts]
+
+            #one copy of each content per batch, the primary key takes care of the ones stored by earlier batches
+            blobs = {}
+            for h, text, p in zip(hashes, texts, raw_pages):
+                blobs.setdefault(h, (text, p["scraped_at"]))
+
+            blob_batch = pa.table({
+                "content_hash": list(blobs),
+                "html": pa.array([text for text, _ in blobs.values()], pa.large_string()),
+                "first_seen_at": [scraped_at for _, scraped_at in blobs.values()],
+            })
+
+            self._load("html_blobs_batch", blob_batch, """
+            INSERT INTO raw_html_blobs
+            SELECT content_hash, html, first_seen_at FROM html_blobs_batch
+            ON CONFLICT (content_hash) DO NOTHING
+            """)
+
+            batch = pa.table({
+                "run_id": [p["run_id"] for p in raw_pages],
+                "department": [p["department"] for p in raw_pages],
+                "url": [p["url"] for p in raw_pages],
+                "content_hash": hashes,
+                "fetch_method": [p["fetch_method"] for p in raw_pages],
+                "scraped_at": [p["scraped_at"] for p in raw_pages],
+            })
 
-            logger.info(f"inserted {len(raw_pages)} raw pages")
+            self._load("raw_pages_batch", batch, """
+            INSERT INTO faculty_raw_pages (run_id, department, url, content_hash, fetch_method, scraped_at)
+            SELECT run_id, department, url, content_hash, fetch_method, scraped_at FROM raw_pages_batch
+            """)
+
+            logger.info(f"inserted {len(raw_pages)} raw pages ({len(blobs)} distinct html)")
 
 
 
@@ -126,43 +342,183 @@ class DuckDBWriter:
             """
             This inserts or updates the normalized faculty records
 
+            Like the raw pages the batch is loaded from one Arrow table. Only the records where some field
+            changed are written, as a new version in faculty_records_history (closing the previous one)
+            and into faculty_records, an unchanged record isn't rewritten
             """
 
             if not records:
-                 logger.Warning(f"No faculty records fount to insert")
+                 logger.warning(f"No faculty records found to insert")
                  return
 
-            #the timestamp for the insertion of these records used for the scraped_at column
+            #the timestamp for the insertion of these records used for the scraped_at column, records re-extracted
+            #from stored snapshots carry the time their page was scraped instead
             eastern_timezone = ZoneInfo("America/New_York")
             now = datetime.now(eastern_timezone)
 
-            
-        
+            #one statement can't update the same row twice, a page scraped twice in a batch keeps its last record
+            records = list({r["webpage_link"]: r for r in records}.values())
+
+            batch = pa.table({
+                "name": pa.array([r["name"] for r in records], pa.string()),
+                "department": pa.array([r["department"] for r in records], pa.string()),
+                "webpage_link": pa.array([r["webpage_link"] for r in records], pa.string()),
+                "title": pa.array([r["title"] for r in records], pa.string()),
+                "bio": pa.array([r["bio"] for r in records], pa.string()),
+                "expertise": pa.array([_expertise_list(r["expertise"]) for r in records], pa.list_(pa.string())),
+                "email": pa.array([r["email"] for r in records], pa.string()),
+                "scraped_at": [r.get("scraped_at") or now for r in records],
+            })
+
+            #the diff against the current history rows happens inside DuckDB, only the records where some field
+            #changed (or that are new) go on to the history and faculty_records writes
+            with self.transaction():
+                self._load("records_batch", batch, f"""
+                CREATE OR REPLACE TEMP TABLE records_changes AS
+                SELECT b.*, greatest(b.scraped_at, coalesce(h.valid_from, b.scraped_at)) AS valid_from
+                FROM records_batch b
+                LEFT JOIN faculty_records_history h ON h.webpage_link = b.webpage_link AND h.valid_to IS NULL
+                WHERE h.webpage_link IS NULL
+                   OR {" OR ".join(f"b.{field} IS DISTINCT FROM h.{field}" for field in RECORD_FIELDS)}
+                """)
+
+                changed, = self.con.execute("SELECT count(*) FROM records_changes").fetchone()
+
+                if changed:
+                    #closes the version each changed record replaces, then opens the new one
+                    self.con.execute("""
+                    UPDATE faculty_records_history h
+                    SET valid_to = c.valid_from
+                    FROM records_changes c
+                    WHERE h.webpage_link = c.webpage_link AND h.valid_to IS NULL
+                    """)
+
+                    self.con.execute(f"""
+                    INSERT INTO faculty_records_history
+                    SELECT {", ".join(RECORD_FIELDS)}, webpage_link, valid_from, NULL FROM records_changes
+                    """)
+
+                    #if the primary key webpage_link (faculty member) already exists, update all the fields with the new data, overwriting old
+                    #if not then insert a new row, records that didn't change aren't rewritten
+                    self.con.execute("""
+                    INSERT INTO faculty_records
+                    SELECT name, department, webpage_link, title, bio, expertise, email, scraped_at FROM records_changes
+                    ON CONFLICT (webpage_link) DO UPDATE SET         
+                                name = excluded.name,
+                                department = excluded.department,
+                                title = excluded.title,
+                                bio = excluded.bio,
+                                expertise = excluded.expertise,
+                                email = excluded.email,
+                                scraped_at = excluded.scraped_at
+                    """)
+
+                    self.con.execute("""
+                    DELETE FROM faculty_expertise WHERE webpage_link IN (SELECT webpage_link FROM records_changes)
+                    """)
+
+                    self.con.execute(f"""
+                    INSERT INTO faculty_expertise
+                    {_EXPLODE_EXPERTISE.format(source="records_changes")}
+                    """)
+
+                self.con.execute("DROP TABLE records_changes")
+
+            logger.info(f"Upserted {changed} new or changed faculty records out of {len(records)}")
+
+
+
+    def _migrate_raw_html(self):
+        """
+        Moves the html of a faculty_raw_pages table from before raw_html_blobs into the blob table, one copy per
+        distinct content, and rebuilds faculty_raw_pages with a content_hash column in its place
+        """
+        columns = {row[0] for row in self.con.execute("""
+            SELECT column_name FROM duckdb_columns() WHERE table_name = 'faculty_raw_pages'
+        """).fetchall()}
 
-            #if the primary key webpage_link (faculty member) already exists, update all the fields with the new data, overwriting old
-            #if not then insert a new row
-            self.con.executemany("""
-            INSERT INTO faculty_records
-            VALUES (?,?,?,?,?,?,?,?)
-            ON CONFLICT (webpage_link) DO UPDATE SET         
-                        name = excluded.name,
-                        department = excluded.department,
-                        title = excluded.title,
-                        bio = excluded.bio,
-                        expertise = excluded.expertise,
-                        email = excluded.email,
-                        scraped_at = excluded.scraped_at
-            """, 
-            
-            [( r["name"], r["department"], r["webpage_link"], r["title"], r["bio"], 
-                 json.dumps(r["expertise"]) if r["expertise"] else None, r["email"], now )for r in records]
-            )
+        if "html" not in columns:
+            return
 
-            logger.info(f"Upserted {len(records)} faculty records")
+        logger.info("moving raw html from faculty_raw_pages into raw_html_blobs")
+
+        #sha256() of a string hashes its utf-8 bytes, the same as content_hash()
+        with self.transaction():
+            self.con.execute("""
+                INSERT INTO raw_html_blobs
+                SELECT sha256(html), any_value(html), min(scraped_at) FROM faculty_raw_pages
+                WHERE html IS NOT NULL
+                GROUP BY sha256(html)
+                ON CONFLICT (content_hash) DO NOTHING
+            """)
+
+            self.con.execute("""
+                CREATE TABLE faculty_raw_pages_migrated AS
+                SELECT run_id, department, url, sha256(html) AS content_hash, fetch_method, scraped_at
+                FROM faculty_raw_pages
+            """)
+
+            self.con.execute("DROP TABLE faculty_raw_pages")
+            self.con.execute("ALTER TABLE faculty_raw_pages_migrated RENAME TO faculty_raw_pages")
+
+
+
+    def _migrate_expertise(self):
+        """
+        Converts expertise columns still holding json text (a json array of terms) into VARCHAR[]
+        """
+        tables = [row[0] for row in self.con.execute("""
+            SELECT table_name FROM duckdb_columns()
+            WHERE column_name = 'expertise' AND data_type <> 'VARCHAR[]'
+              AND table_name IN ('faculty_records', 'faculty_records_history')
+        """).fetchall()]
+
+        for table in tables:
+            logger.info(f"converting {table}.expertise from json text to VARCHAR[]")
+
+            with self.transaction():
+                #an index on the table blocks altering it, init_tables creates it again right after
+                if table == "faculty_records_history":
+                    self.con.execute("DROP INDEX IF EXISTS faculty_records_history_link")
+
+                #anything that isn't a json array becomes a one term list
+                self.con.execute(f"""
+                    ALTER TABLE {table} ALTER expertise TYPE VARCHAR[] USING
+                    CASE
+                        WHEN expertise IS NULL THEN NULL
+                        WHEN NOT json_valid(expertise) THEN [expertise]
+                        WHEN json_type(expertise) = 'ARRAY' THEN from_json(expertise, '["VARCHAR"]')
+                        ELSE [expertise ->> '$']
+                    END
+                """)
+
+
+
+    def _compresses_strings(self) -> bool:
+        """whether the database file's storage format is recent enough for zstd compressed strings"""
+        tags, = self.con.execute("""
+            SELECT tags FROM duckdb_databases() WHERE database_name = current_database()
+        """).fetchone()
+
+        version = tags.get("storage_version") or ""
+        return not version.startswith(("v0.", "v1.0", "v1.1"))
+
+
+
+    def _load(self, name: str, batch: pa.Table, sql: str):
+        """
+        Registers an Arrow table as a view for the statement that loads it, DuckDB scans it columnar
+        without copying it into python objects row by row
+        """
+        self.con.register(name, batch)
+
+        try:
+            self.con.execute(sql)
+        finally:
+            self.con.unregister(name)
 
 
 
-    
     def insert_scrape_run(self, metrics: dict):
         """
         storing the metrics, each row corresponds to a single entire scrape execution
@@ -184,7 +540,7 @@ class DuckDBWriter:
              f"Inserted scrape run metrics | "
              f"pages = {metrics[ 'pages_fetched']} "
              f"records={metrics['records_parsed']} "
-             f"failures={metrics["parse_failures"]}"
+             f"failures={metrics['parse_failures']}"
         )
 
 
@@ -214,4 +570,219 @@ class DuckDBWriter:
 
 
 
+    def load_validators(self) -> dict[str, dict]:
+        """
+        Returns the stored ETag / Last-Modified validators keyed by url
+        """
+        rows = self.con.execute("""
+            SELECT url, etag, last_modified FROM http_validators
+        """).fetchall()
+
+        logger.info(f"Loaded {len(rows)} HTTP validators")
+
+        return {url: {"etag": etag, "last_modified": last_modified} for url, etag, last_modified in rows}
+
+
+
+    def upsert_validators(self, validators: dict[str, dict]):
+        """
+        Inserts or replaces the validators of the pages that were freshly downloaded and parsed this run
+        """
+
+        if not validators:
+            return
+
+        now = datetime.now(ZoneInfo("America/New_York"))
+
+        self.con.executemany("""
+        INSERT INTO http_validators VALUES (?,?,?,?)
+        ON CONFLICT (url) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    updated_at = excluded.updated_at
+        """,
+
+        [(url, v["etag"], v["last_modified"], now) for url, v in validators.items()]
+        )
+
+        logger.info(f"Upserted {len(validators)} HTTP validators")
+
+
+
+    def load_fingerprints(self) -> dict[str, str]:
+        """
+        Returns the stored content fingerprints keyed by url
+        """
+        rows = self.con.execute("""
+            SELECT url, fingerprint FROM page_fingerprints
+        """).fetchall()
+
+        logger.info(f"Loaded {len(rows)} page fingerprints")
+
+        return dict(rows)
+
+
+
+    def upsert_fingerprints(self, fingerprints: dict[str, str]):
+        """
+        Inserts or replaces the fingerprints of the pages that were freshly downloaded and parsed this run
+        """
+
+        if not fingerprints:
+            return
+
+        now = datetime.now(ZoneInfo("America/New_York"))
+
+        self.con.executemany("""
+        INSERT INTO page_fingerprints VALUES (?,?,?)
+        ON CONFLICT (url) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    updated_at = excluded.updated_at
+        """,
+
+        [(url, fingerprint, now) for url, fingerprint in fingerprints.items()]
+        )
+
+        logger.info(f"Upserted {len(fingerprints)} page fingerprints")
+
+
+
+    def load_host_routes(self) -> dict[str, dict]:
+        """
+        Returns the stored fetch method of each host with a timezone aware updated_at
+        """
+        eastern_timezone = ZoneInfo("America/New_York")
+
+        #TIMESTAMP columns come back naive in the session timezone, epoch() of the TIMESTAMPTZ cast gives the real instant
+        rows = self.con.execute("""
+            SELECT host, method, epoch(updated_at::TIMESTAMPTZ) FROM host_fetch_routes
+        """).fetchall()
+
+        return {
+            host: {
+                "method": method,
+                "updated_at": datetime.fromtimestamp(ts, eastern_timezone) if ts is not None else None,
+            }
+            for host, method, ts in rows
+        }
+
+
+
+    def upsert_host_routes(self, routes: dict[str, dict]):
+        """
+        Inserts or replaces the fetch method of the hosts whose route changed
+        """
+
+        if not routes:
+            return
+
+        self.con.executemany("""
+        INSERT INTO host_fetch_routes VALUES (?,?,?)
+        ON CONFLICT (host) DO UPDATE SET
+                    method = excluded.method,
+                    updated_at = excluded.updated_at
+        """,
+
+        [(host, r["method"], r["updated_at"]) for host, r in routes.items()]
+        )
+
+        logger.info(f"Upserted {len(routes)} host fetch routes")
+
+
+
+    def raw_page_batches(self, run_id: str | None = None, departments: list[str] | None = None, batch_size: int = 500):
+        """
+        Returns an iterator over stored snapshots with their html, in lists of up to batch_size dicts with
+        department, url, html and scraped_at. With run_id only that run's snapshots, otherwise the latest
+        snapshot of every url. departments (case insensitive) limits it to those departments
+
+        The query runs on its own cursor and the rows are streamed from it batch by batch, so the iterator
+        can be read from another thread while this connection keeps writing and the archive never has to
+        fit in memory
+        """
+        cursor = self.con.cursor()
+
+        reader = cursor.execute("""
+            SELECT p.department, p.url, b.html, p.scraped_at
+            FROM faculty_raw_pages p
+            JOIN raw_html_blobs b USING (content_hash)
+            WHERE (?::TEXT IS NULL OR p.run_id = ?)
+              AND (?::TEXT[] IS NULL OR list_contains(?::TEXT[], lower(p.department)))
+            QUALIFY row_number() OVER (PARTITION BY p.url ORDER BY p.scraped_at DESC) = 1
+        """, (
+            run_id, run_id,
+            [d.lower() for d in departments] if departments else None,
+            [d.lower() for d in departments] if departments else None,
+        )).fetch_record_batch(batch_size)
+
+        def batches():
+            try:
+                for batch in reader:
+                    yield batch.to_pylist()
+            finally:
+                cursor.close()
+
+        return batches()
+
+
+
+    def load_discovery(self, department: str, ttl_minutes: int) -> list[str] | None:
+        """
+        Returns the cached profile urls of a department if they were discovered within the last ttl_minutes
+        """
+
+        if ttl_minutes <= 0:
+            return None
+
+        #discovered_at is stored in the session timezone, so it is compared to the session's local time
+        row = self.con.execute("""
+            SELECT urls FROM discovery_cache
+            WHERE department = ?
+              AND discovered_at >= current_localtimestamp() - to_minutes(?)
+        """, (department, ttl_minutes)).fetchone()
+
+        return list(row[0]) if row else None
+
+
+
+    def save_discovery(self, department: str, urls: list[str]):
+        """
+        Inserts or replaces the profile urls discovered for a department
+        """
+
+        if not urls:
+            return
+
+        now = datetime.now(ZoneInfo("America/New_York"))
+
+        self.con.execute("""
+        INSERT INTO discovery_cache VALUES (?,?,?)
+        ON CONFLICT (department) DO UPDATE SET
+                    urls = excluded.urls,
+                    discovered_at = excluded.discovered_at
+        """, (department, urls, now))
+
+        logger.info(f"Cached {len(urls)} profile urls for {department}")
+
+
+
+
+
+
+def _expertise_list(expertise) -> list[str] | None:
+    """expertise as a list of terms, None when there is none"""
+    if not expertise:
+        return None
+    return list(expertise) if isinstance(expertise, (list, tuple)) else [expertise]
+
+
+
+def content_hash(html: str) -> str:
+    """sha256 hex digest of the utf-8 text of a page, what raw_html_blobs is keyed by"""
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
 
+def _html_text(html: str | bytes) -> str:
+    #the html column is TEXT, PageBytes.decode() uses the page's own encoding
+    return html.decode() if isinstance(html, bytes) else html
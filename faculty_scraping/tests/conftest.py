@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+#the modules are imported the way run.py imports them, from the faculty_scraping directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+#scripts that scrape the live sites, run them by hand
+collect_ignore = ["BSDS_test.py", "Psychology_test.py", "debug_expertise.py"]
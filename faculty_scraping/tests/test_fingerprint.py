@@ -0,0 +1,79 @@
+import time
+
+from scrapers.fingerprint import content_fingerprint
+
+
+PROFILE = (
+    b'<html><head><title>Jane Doe</title><meta name="csrf" content="abc123"></head>'
+    b'<body class="profile"><h1>Jane Doe</h1>'
+    b'<input type="hidden" name="form_build_id" value="{token}">'
+    b'<p class="updated">2025-01-0{day}T10:00:00Z</p>'
+    b'<link href="/style.css?v={version}"><p>{body}</p>'
+)
+
+
+def page(body: bytes = b"Professor of Data Science", token: bytes = b"a1", day: bytes = b"1",
+         version: bytes = b"1", closed: bool = True) -> bytes:
+    html = PROFILE.replace(b"{token}", token).replace(b"{day}", day).replace(b"{version}", version)
+    html = html.replace(b"{body}", body)
+    return html + b"</body></html>" if closed else html
+
+
+
+def test_volatile_bits_are_ignored():
+    assert content_fingerprint(page()) == content_fingerprint(page(token=b"zz", day=b"2", version=b"9"))
+
+
+def test_content_change_is_detected():
+    assert content_fingerprint(page()) != content_fingerprint(page(body=b"Professor of Statistics"))
+
+
+def test_str_and_bytes_agree():
+    assert content_fingerprint(page().decode()) == content_fingerprint(page())
+
+
+def test_page_without_closing_body():
+    #</body> is optional and truncated responses lack it, the page is hashed whole instead
+    assert content_fingerprint(page(closed=False)) != content_fingerprint(page(body=b"Other", closed=False))
+    assert content_fingerprint(page(closed=False)) == content_fingerprint(page(token=b"zz", closed=False))
+
+
+def test_page_without_closing_body_is_linear():
+    #a <body ...>(.*)</body> regex used to backtrack quadratically here, seconds for a 150 KB page
+    body = b"<div><a href='/x'>Research interest</a></div>\n" * 3200
+    html = page(body=body, closed=False)
+    assert len(html) > 140_000
+
+    started = time.perf_counter()
+    content_fingerprint(html)
+    assert time.perf_counter() - started < 0.5
+
+
+
+REGIONS = ("div.field-body", "h1")
+
+REGION_PAGE = (
+    b'<html><body><nav><a href="/news">{nav}</a></nav>'
+    b'<h1>Jane Doe</h1><div class="field-body"><div><p>{bio}</p></div><p>Second</p></div>'
+    b'<footer>{footer}</footer></body></html>'
+)
+
+
+def region_page(nav: bytes = b"News", bio: bytes = b"Bio", footer: bytes = b"2025") -> bytes:
+    return REGION_PAGE.replace(b"{nav}", nav).replace(b"{bio}", bio).replace(b"{footer}", footer)
+
+
+
+def test_changes_outside_the_regions_are_ignored():
+    assert content_fingerprint(region_page(), REGIONS) == content_fingerprint(region_page(nav=b"Events", footer=b"2026"), REGIONS)
+
+
+def test_changes_inside_the_regions_are_detected():
+    #the nested <div> mustn't end the region early
+    assert content_fingerprint(region_page(), REGIONS) != content_fingerprint(region_page(bio=b"New bio"), REGIONS)
+
+
+def test_page_without_regions_hashes_the_body():
+    regions = ("div.field-body",)
+    assert content_fingerprint(page(), regions) == content_fingerprint(page())
+    assert content_fingerprint(page(), regions) != content_fingerprint(page(body=b"Other"), regions)
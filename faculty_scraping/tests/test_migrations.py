@@ -0,0 +1,128 @@
+"""
+Migrations of databases written by earlier versions of the pipeline
+"""
+
+from datetime import datetime
+
+import duckdb
+import pytest
+
+from storage.duckdb_writer import DuckDBWriter, content_hash
+
+
+#the tables as the baseline pipeline created them, html inline and expertise as json text
+BASELINE_SCHEMA = """
+    CREATE TABLE faculty_raw_pages (
+        run_id TEXT, department TEXT, url TEXT, html TEXT, fetch_method TEXT, scraped_at TIMESTAMP
+    );
+    CREATE TABLE faculty_records (
+        name TEXT, department TEXT, webpage_link TEXT PRIMARY KEY, title TEXT, bio TEXT,
+        expertise TEXT, email TEXT, scraped_at TIMESTAMP
+    );
+"""
+
+#the history table as it was before expertise became a list, with the index that blocks ALTER
+HISTORY_SCHEMA = """
+    CREATE TABLE faculty_records_history (
+        name TEXT, department TEXT, title TEXT, bio TEXT, expertise TEXT, email TEXT,
+        webpage_link TEXT, valid_from TIMESTAMP, valid_to TIMESTAMP
+    );
+    CREATE INDEX faculty_records_history_link ON faculty_records_history (webpage_link);
+"""
+
+PAGE_A = "<html><body><h1>Ann Smith</h1></body></html>"
+PAGE_B = "<html><body><h1>Bob Jones</h1></body></html>"
+
+FIRST_RUN = datetime(2025, 1, 1, 9, 0)
+SECOND_RUN = datetime(2025, 2, 1, 9, 0)
+
+
+
+def baseline_db(path, history: bool = False) -> None:
+    con = duckdb.connect(str(path))
+    con.execute(BASELINE_SCHEMA)
+
+    con.executemany(
+        "INSERT INTO faculty_raw_pages VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            ("run1", "Data Science", "https://x.edu/a", PAGE_A, "http", FIRST_RUN),
+            ("run1", "Data Science", "https://x.edu/b", PAGE_B, "http", FIRST_RUN),
+            ("run2", "Data Science", "https://x.edu/a", PAGE_A, "http", SECOND_RUN),
+        ],
+    )
+    con.executemany(
+        "INSERT INTO faculty_records VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("Ann Smith", "Data Science", "https://x.edu/a", "Professor", "Bio", '["Machine  Learning", "NLP"]', "a@x.edu", FIRST_RUN),
+            ("Bob Jones", "Data Science", "https://x.edu/b", None, None, None, None, FIRST_RUN),
+            ("Cy Lee", "Economics", "https://x.edu/c", None, None, "Labor Economics", None, FIRST_RUN),
+        ],
+    )
+
+    if history:
+        con.execute(HISTORY_SCHEMA)
+        con.execute("""
+            INSERT INTO faculty_records_history
+            SELECT name, department, title, bio, expertise, email, webpage_link, scraped_at, NULL FROM faculty_records
+        """)
+
+    con.close()
+
+
+
+@pytest.mark.parametrize("history", [False, True], ids=["baseline", "with_history"])
+def test_migrates_older_database(tmp_path, history):
+    path = tmp_path / "faculty.duckdb"
+    baseline_db(path, history=history)
+
+    db = DuckDBWriter(str(path))
+    db.init_tables()
+    con = db.con
+
+    #the html moved to one blob per distinct content, the snapshots keep their hash
+    blobs = dict(con.execute("SELECT content_hash, html FROM raw_html_blobs").fetchall())
+    assert blobs == {content_hash(PAGE_A): PAGE_A, content_hash(PAGE_B): PAGE_B}
+
+    columns = [row[0] for row in con.execute("DESCRIBE faculty_raw_pages").fetchall()]
+    assert "html" not in columns
+
+    snapshots = con.execute("SELECT run_id, url, content_hash FROM faculty_raw_pages ORDER BY run_id, url").fetchall()
+    assert snapshots == [
+        ("run1", "https://x.edu/a", content_hash(PAGE_A)),
+        ("run1", "https://x.edu/b", content_hash(PAGE_B)),
+        ("run2", "https://x.edu/a", content_hash(PAGE_A)),
+    ]
+
+    html, = con.execute("SELECT html FROM faculty_raw_pages_html WHERE run_id = 'run2'").fetchone()
+    assert html == PAGE_A
+
+    #json arrays become lists, plain text a one term list
+    for table in ("faculty_records", "faculty_records_history"):
+        types = dict(con.execute(f"SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = '{table}'").fetchall())
+        assert types["expertise"] == "VARCHAR[]"
+
+        expertise = dict(con.execute(f"SELECT webpage_link, expertise FROM {table}").fetchall())
+        assert expertise == {
+            "https://x.edu/a": ["Machine  Learning", "NLP"],
+            "https://x.edu/b": None,
+            "https://x.edu/c": ["Labor Economics"],
+        }
+
+    terms = con.execute("SELECT webpage_link, term, normalized_term FROM faculty_expertise ORDER BY webpage_link, term").fetchall()
+    assert terms == [
+        ("https://x.edu/a", "Machine  Learning", "machine learning"),
+        ("https://x.edu/a", "NLP", "nlp"),
+        ("https://x.edu/c", "Labor Economics", "labor economics"),
+    ]
+
+    #every record starts its history with one current version
+    versions = con.execute("SELECT webpage_link, valid_from, valid_to FROM faculty_records_history ORDER BY webpage_link").fetchall()
+    assert versions == [(link, FIRST_RUN, None) for link in ("https://x.edu/a", "https://x.edu/b", "https://x.edu/c")]
+
+    #running the migrations again changes nothing
+    db.init_tables()
+    assert con.execute("SELECT count(*) FROM raw_html_blobs").fetchone() == (2,)
+    assert con.execute("SELECT count(*) FROM faculty_records_history").fetchone() == (3,)
+    assert con.execute("SELECT count(*) FROM faculty_expertise").fetchone() == (3,)
+
+    con.close()
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import pytest
+
+from scrapers.rate_limiter import HostLimiter
+
+
+
+def test_robots_fetched_once_per_host_and_hosts_in_parallel():
+    fetched = []
+
+    async def fetch_robots(url):
+        fetched.append(url)
+        await asyncio.sleep(0.2)
+        return "User-agent: *\nCrawl-delay: 1"
+
+    async def main():
+        limiter = HostLimiter()
+        urls = [f"https://{host}.edu/people/{i}" for host in ("a", "b", "c", "d") for i in range(3)]
+
+        started = time.perf_counter()
+        await asyncio.gather(*(limiter.ensure_robots(url, fetch_robots) for url in urls))
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(main())
+
+    assert sorted(fetched) == [f"https://{host}.edu/robots.txt" for host in ("a", "b", "c", "d")]
+    #one host's robots.txt doesn't wait on another's
+    assert elapsed < 0.4
+
+
+
+HOST_URL = "https://example.edu/people/a"
+
+
+async def request(limiter: HostLimiter, latency: float, status: int = 200, headers: dict | None = None) -> None:
+    async with limiter.slot(HOST_URL) as slot:
+        await asyncio.sleep(latency)
+        slot.record_response(status, headers or {})
+
+
+def limit(limiter: HostLimiter) -> int:
+    return int(limiter._state("example.edu").limit)
+
+
+
+def test_healthy_responses_grow_the_limit():
+    async def main():
+        limiter = HostLimiter(initial=2, max_limit=8)
+        for _ in range(40):
+            await request(limiter, 0.002)
+        return limit(limiter)
+
+    assert asyncio.run(main()) == 8
+
+
+def test_one_fast_response_doesnt_stop_the_growth():
+    #a near instant 304 or 404 used to become the baseline for the rest of the run
+    async def main():
+        limiter = HostLimiter(initial=2, max_limit=8)
+        await request(limiter, 0)
+        for _ in range(40):
+            await request(limiter, 0.002)
+        return limit(limiter)
+
+    assert asyncio.run(main()) > 4
+
+
+def test_slowing_host_stops_the_growth():
+    async def main():
+        limiter = HostLimiter(initial=2, max_limit=32)
+        for _ in range(10):
+            await request(limiter, 0.002)
+        grown = limit(limiter)
+
+        for _ in range(3):
+            await request(limiter, 0.05)
+        return grown, limit(limiter)
+
+    grown, slowed = asyncio.run(main())
+    assert slowed == grown
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_error_statuses_back_off(status):
+    async def main():
+        limiter = HostLimiter(initial=8)
+        await request(limiter, 0, status)
+        return limit(limiter)
+
+    assert asyncio.run(main()) == 4
+
+
+def test_backoff_once_per_window():
+    async def main():
+        limiter = HostLimiter(initial=8)
+        await asyncio.gather(*(request(limiter, 0, 503) for _ in range(4)))
+        return limit(limiter)
+
+    assert asyncio.run(main()) == 4
+
+
+def test_retry_after_pauses_the_host():
+    async def main():
+        limiter = HostLimiter()
+        await request(limiter, 0, 429, {"Retry-After": "1"})
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(request(limiter, 0), 0.2)
+
+        state = limiter._state("example.edu")
+        return state.paused_until - asyncio.get_running_loop().time()
+
+    assert 0.5 < asyncio.run(main()) <= 1
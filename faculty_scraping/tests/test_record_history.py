@@ -0,0 +1,68 @@
+"""
+The faculty record history, a new version only when some field of a record changed
+"""
+
+from datetime import datetime
+
+import pytest
+
+from storage.duckdb_writer import DuckDBWriter
+
+
+FIRST_RUN = datetime(2025, 1, 1, 9, 0)
+SECOND_RUN = datetime(2025, 2, 1, 9, 0)
+
+
+
+@pytest.fixture
+def writer(tmp_path):
+    db = DuckDBWriter(str(tmp_path / "faculty.duckdb"))
+    db.init_tables()
+    yield db
+    db.con.close()
+
+
+
+def record(name="Ann Smith", title="Professor", expertise=("Machine Learning", "NLP"), scraped_at=FIRST_RUN) -> dict:
+    return {
+        "name": name,
+        "department": "Data Science",
+        "webpage_link": "https://x.edu/a",
+        "title": title,
+        "bio": "Bio",
+        "expertise": list(expertise),
+        "email": "a@x.edu",
+        "scraped_at": scraped_at,
+    }
+
+
+
+def history(writer) -> list[tuple]:
+    return writer.con.execute("""
+        SELECT title, valid_from, valid_to FROM faculty_records_history ORDER BY valid_from
+    """).fetchall()
+
+
+
+def test_unchanged_record_adds_no_version(writer):
+    writer.insert_records([record()])
+    writer.insert_records([record(scraped_at=SECOND_RUN)])
+
+    assert history(writer) == [("Professor", FIRST_RUN, None)]
+
+    #faculty_records isn't rewritten either, it keeps the time the record last changed
+    assert writer.con.execute("SELECT scraped_at FROM faculty_records").fetchall() == [(FIRST_RUN,)]
+
+
+
+def test_changed_record_closes_the_previous_version(writer):
+    writer.insert_records([record()])
+    writer.insert_records([record(title="Chair", expertise=("NLP",), scraped_at=SECOND_RUN)])
+
+    assert history(writer) == [("Professor", FIRST_RUN, SECOND_RUN), ("Chair", SECOND_RUN, None)]
+
+    current = writer.con.execute("SELECT title, expertise FROM faculty_records_current").fetchall()
+    assert current == [("Chair", ["NLP"])]
+
+    terms = writer.con.execute("SELECT term FROM faculty_expertise").fetchall()
+    assert terms == [("NLP",)]
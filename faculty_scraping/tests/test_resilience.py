@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from scrapers.data_science_scraper import DataScienceScraper
+from scrapers.resilience import CircuitBreaker, HostUnavailableError, RetryPolicy
+
+
+URL = "https://example.edu/people/a"
+
+
+def open_breaker(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, **kwargs)
+    breaker.record_failure(URL)
+    assert breaker.is_open(URL)
+    return breaker
+
+
+
+def test_requests_wait_for_the_probe():
+    async def main():
+        breaker = open_breaker(reset_timeout=0.05)
+        assert await breaker.before_request(URL)
+
+        #the others wait instead of failing, and go ahead once the probe got through
+        waiting = asyncio.gather(*(breaker.before_request(URL) for _ in range(3)))
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+
+        breaker.record_success(URL)
+        assert await waiting == [False, False, False]
+
+    asyncio.run(main())
+
+
+def test_failed_probe_reopens_and_the_next_request_probes():
+    async def main():
+        breaker = open_breaker(reset_timeout=0.05)
+        assert await breaker.before_request(URL)
+
+        waiting = asyncio.create_task(breaker.before_request(URL))
+        breaker.record_failure(URL, probe=True)
+
+        started = time.monotonic()
+        assert await waiting
+        assert time.monotonic() - started >= 0.04
+
+    asyncio.run(main())
+
+
+def test_probe_without_outcome_frees_the_slot():
+    #a probe that got cancelled or handed to the browser records neither a success nor a failure
+    async def main():
+        breaker = open_breaker(reset_timeout=0)
+        assert await breaker.before_request(URL)
+        breaker.end_probe(URL)
+
+        assert await breaker.before_request(URL)
+
+    asyncio.run(main())
+
+
+def test_host_given_up_after_failed_probes():
+    async def main():
+        breaker = open_breaker(reset_timeout=0, max_failed_probes=2)
+        for _ in range(2):
+            assert await breaker.before_request(URL)
+            breaker.record_failure(URL, probe=True)
+
+        with pytest.raises(HostUnavailableError):
+            await breaker.before_request(URL)
+
+    asyncio.run(main())
+
+
+
+
+
+class BurstScraper(DataScienceScraper):
+    """Data science scraper against a host that answers 503 for its first burst_seconds"""
+
+    burst_seconds = 0.3
+
+    def _get_client(self):
+        if self._client is None:
+            started = time.monotonic()
+
+            def handler(request):
+                if request.url.path == "/robots.txt":
+                    return httpx.Response(404)
+                if time.monotonic() - started < self.burst_seconds:
+                    return httpx.Response(503)
+                return httpx.Response(200, text=f"<html><body><h1>{request.url.path}</h1></body></html>")
+
+            self._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return self._client
+
+
+
+def test_short_5xx_burst_still_fetches_every_page():
+    async def main():
+        scraper = BurstScraper(
+            run_id="test",
+            retry_policy=RetryPolicy(max_retries=1, base_delay=0.01),
+            circuit_breaker=CircuitBreaker(failure_threshold=3, reset_timeout=0.1),
+        )
+        try:
+            urls = [f"https://example.edu/people/{i}" for i in range(60)]
+            return await asyncio.gather(*(scraper.fetch_page(url) for url in urls), return_exceptions=True)
+        finally:
+            await scraper.close()
+
+    results = asyncio.run(main())
+
+    assert [r for r in results if isinstance(r, BaseException)] == []
+    assert all(method == "http" for _, method in results)
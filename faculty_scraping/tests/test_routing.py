@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import httpx
+
+from scrapers.data_science_scraper import DataScienceScraper
+from scrapers.economics_scraper import EconomicsScraper
+from scrapers.routing import FetchRouter
+
+
+URL = "https://shared.example.edu/people/a"
+COOKIES = [{"name": "cf_clearance", "value": "ok", "domain": "shared.example.edu", "path": "/"}]
+USER_AGENT = "Mozilla/5.0 (cleared browser)"
+
+
+
+def challenged_host(request):
+    """Lets requests through only with the clearance cookie and the user agent it was issued to"""
+    if request.url.path == "/robots.txt":
+        return httpx.Response(404)
+
+    cleared = "cf_clearance=ok" in request.headers.get("cookie", "") and request.headers["user-agent"] == USER_AGENT
+    if cleared:
+        return httpx.Response(200, text="<html><body><h1>A</h1></body></html>")
+    return httpx.Response(403, headers={"cf-mitigated": "challenge"}, text="<title>Just a moment...</title>")
+
+
+
+def with_mock_client(scraper):
+    scraper._client = httpx.AsyncClient(transport=httpx.MockTransport(challenged_host))
+    return scraper
+
+
+
+def test_clearance_is_shared_between_departments():
+    #one department's browser passed the challenge, another department on the same host goes over HTTP with it
+    async def main():
+        router = FetchRouter({"shared.example.edu": {"method": "browser", "updated_at": None}})
+        router.record_clearance(URL, time.time() + 600, COOKIES, USER_AGENT)
+
+        other = with_mock_client(EconomicsScraper(run_id="test", router=router))
+        try:
+            result = await other.fetch_page(URL, profile=True)
+        finally:
+            await other.close()
+
+        return result, router
+
+    (html, method), router = asyncio.run(main())
+
+    assert method == "http"
+    assert router.has_clearance(URL)
+    assert router.routes["shared.example.edu"]["method"] == "browser"
+
+
+
+def test_expired_or_challenged_clearance_is_dropped():
+    router = FetchRouter()
+
+    router.record_clearance(URL, time.time() - 1, COOKIES, USER_AGENT)
+    assert router.clearance(URL) is None
+
+    router.record_clearance(URL, time.time() + 600, COOKIES, USER_AGENT)
+    assert router.clearance(URL)["user_agent"] == USER_AGENT
+
+    router.record_block(URL)
+    assert router.clearance(URL) is None
+    assert router.prefers_browser(URL)